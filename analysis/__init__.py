@@ -5,5 +5,12 @@ from ._optimisation import Optimise
 from ._tables import *
 from ._visuals import *
 from ._utilities import *
+from ._http import *
+from ._query_cache import *
+from ._instrumentation import *
+from ._notifications import *
+from ._timeseries_store import *
+from ._storage import *
 from ._heroku_connect import *
+from ._sqlite_connect import *
 from ._yields_data import *
\ No newline at end of file
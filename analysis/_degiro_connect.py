@@ -1,26 +1,109 @@
-import requests as _requests
+from ._http import http_client as _http
 import pandas as _pd
 import json as _json
-from datetime import datetime as _datetime
+import time as _time
+import threading as _threading
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+import numpy as _np
+import hashlib as _hashlib
 import os
+from ._utilities import _assemble_panel
+
+# Default DeGiro session cache (override with the DEGIRO_SESSION_CACHE environment variable)
+_SESSION_CACHE = os.environ.get('DEGIRO_SESSION_CACHE',
+                                os.path.join(os.path.expanduser('~'), '.qlab', 'degiro_session.json'))
+
+class _RateLimiter:
+    '''
+    Spaces out calls to at most rate per second across threads (None for no limit).
+    '''
+
+    def __init__(self, rate=None):
+        self.interval = 0 if not rate else 1/rate
+        self._next = 0
+        self._lock = _threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = _time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+
+        if slot > now:
+            _time.sleep(slot - now)
+
+
+def _vwd_series_frame(points, window_first, first_offset, column_name):
+    """
+    Single column df of vwd [offset, value] points, dated window_first + (offset - first_offset)
+    days, without missing values.
+    """
+    points = _np.asarray(points, dtype=float).reshape(-1, 2)
+    points = points[~_np.isnan(points[:, 1])]
+
+    dates = window_first + (points[:, 0].astype('int64') - first_offset).astype('timedelta64[D]')
+
+    return _pd.DataFrame({column_name: points[:, 1]},
+                         index=_pd.DatetimeIndex(dates.astype('datetime64[ns]'), name='Dates'))
+
 
 class DeGiro():
 
-    def __init__(self, user, psw):
+    def __init__(self, user, psw, session_cache=_SESSION_CACHE, session_ttl=1800):
+        """
+        session_cache: json file where the session/config/client info is kept between runs
+                       (None to log in every time)
+        session_ttl: seconds after login for which a cached session is reused
+        """
         self.user = user
         self.psw = psw
+        self.session_cache = session_cache
+        self.session_ttl = session_ttl
         self._BASE_TRADER_URL = 'https://trader.degiro.nl'
         self._CONFIG_URL = self._BASE_TRADER_URL + '/login/secure/config'
         self._LOGIN_URL = self._BASE_TRADER_URL+'/login/secure/login'
         self._SRCH_URL = 'v5/products/lookup?intAccount='
-        self.credentials = None
+        self._credentials = None
+        self._login_lock = _threading.Lock()
         self.shortcuts = ['YTD', 'P1D', 'P1W', 'P1M', 'P3M', 'P6M', 'P1Y', 'P3Y', 'P5Y', 'P50Y']
         self.user_agent = os.environ.get("USER_AGENT")
+        self.transfer_log = []
+        self.comp_report = None
 
     # --------------------------------------------------------------------------------------------------------------
-    def login(self):
-        
-        product_search_url, account, userToken, config_data, secID = self._get_client_info()
+    @property
+    def credentials(self):
+        """ Session credentials, logging in (or loading the cached session) on first use."""
+        if self._credentials is None:
+            with self._login_lock:
+                if self._credentials is None:
+                    self.login()
+
+        return self._credentials
+
+    @credentials.setter
+    def credentials(self, value):
+        self._credentials = value
+
+    # --------------------------------------------------------------------------------------------------------------
+    def login(self, force=False):
+        '''
+        Reuse the cached session when it has not expired (it is validated by the first request that
+        uses it), otherwise log in and cache the new session. force: always log in.
+        '''
+        if not force:
+            cached = self._load_session()
+            if cached is not None:
+                self.credentials = cached
+                print('Reusing cached DeGiro session')
+                return
+
+        client_info = self._get_client_info()
+        if client_info is None:
+            print('DeGiro login failed')
+            return
+
+        product_search_url, account, userToken, config_data, secID = client_info
         
         data_dct = {'product_search_url': product_search_url,
                     'account_id': account,
@@ -29,8 +112,64 @@ class DeGiro():
                     'session_id': secID}
         
         self.credentials = data_dct
+        self._save_session(data_dct)
         print('Logged in to DeGiro account')
 
+    # --------------------------------------------------------------------------------------------------------------
+    def _cache_key(self):
+        return _hashlib.sha1(self.user.encode('utf-8')).hexdigest()
+
+    def _load_session(self):
+        """ Cached credentials of this user if the cache exists and has not expired, else None."""
+        if self.session_cache is None or not os.path.exists(self.session_cache):
+            return None
+
+        try:
+            with open(self.session_cache) as f:
+                cached = _json.load(f)
+
+            if cached['user'] == self._cache_key() and cached['expires'] > _time.time():
+                return cached['credentials']
+
+        except Exception as e:
+            print('Ignoring DeGiro session cache', e.args)
+
+    def _save_session(self, credentials):
+        """ Write credentials (no password) to the session cache, readable by the owner only."""
+        if self.session_cache is None:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.session_cache) or '.', exist_ok=True)
+            tmp_file = self.session_cache + '.tmp'
+
+            with open(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                _json.dump({'user': self._cache_key(), 'expires': _time.time() + self.session_ttl,
+                            'credentials': credentials}, f)
+            os.replace(tmp_file, self.session_cache)
+
+        except Exception as e:
+            print('DeGiro session not cached', e.args)
+
+    # --------------------------------------------------------------------------------------------------------------
+    def _get_authorized(self, build_url):
+        '''
+        GET build_url(credentials). On a 401 (expired or revoked session) log in again, once for
+        all the threads that used the same session, and repeat the request.
+        '''
+        credentials = self.credentials
+        response = _http.get(build_url(credentials))
+
+        if response.status_code == 401:
+            with self._login_lock:
+                if self._credentials is credentials:
+                    print('DeGiro session expired, logging in again')
+                    self.login(force=True)
+
+            response = _http.get(build_url(self.credentials))
+
+        return response
+
     # --------------------------------------------------------------------------------------------------------------
 
     def _get_client_info(self):
@@ -46,7 +185,7 @@ class DeGiro():
             product_search_url = config_data['data']['productSearchUrl']
             
             try:
-                client_info = _requests.get(url_client, headers = {'user-agent': self.user_agent})
+                client_info = _http.get(url_client, headers = {'user-agent': self.user_agent})
 
                 client_data =  _json.loads(client_info.content.decode("utf-8"))
                 
@@ -74,7 +213,7 @@ class DeGiro():
             secID = self._get_session_id()
             
             if secID is not None:
-                updConfig =  _requests.get(self._CONFIG_URL, headers = {'Cookie':'JSESSIONID='+secID+';','user-agent':self.user_agent})
+                updConfig =  _http.get(self._CONFIG_URL, headers = {'Cookie':'JSESSIONID='+secID+';','user-agent':self.user_agent})
                 
                 if updConfig.status_code ==  200:
                     config_data = _json.loads(updConfig.content.decode("utf-8"))
@@ -91,7 +230,7 @@ class DeGiro():
     def _get_session_id(self):
         
         try:
-            de_giro = _requests.post(self._LOGIN_URL,
+            de_giro = _http.post(self._LOGIN_URL,
                                      headers = {
                                         'Content-Type': 'application/json',
                                         'user-agent': self.user_agent,
@@ -120,22 +259,47 @@ class DeGiro():
             return list(filter(lambda x: list(x.values())[0] in assets, ls))
     # --------------------------------------------------------------------------------------------------------------
     
-    def comp_series(self, securities, ts_type='price', date_range={'range':None,'auto':'P1Y'}):
+    def comp_series(self, securities, ts_type='price', date_range={'range':None,'auto':'P1Y'},
+                    max_workers=8, rate_limit=None):
         '''
         Returns price or volume data for multiple securities given a date range.
         range: e.g. '2019-01-01:2020-12-31'
         auto: e.g.  any of the shortcuts such as 'P1Y'
-        ts_type: 'price' | 'volume'
+        ts_type: 'price' | 'volume' | a list of both, decoded from one request per security and
+                 returned as {ts_type: df}
         securities: list of dictionaries 'vwd_id':'security_name'}
+        max_workers: number of concurrent requests (1 to fetch one security after the other)
+        rate_limit: maximum requests per second to the charting service (None for no limit)
+        Latency, rows and errors per security are kept in comp_report.
         '''
+        ts_types = [ts_type] if isinstance(ts_type, str) else list(ts_type)
+        limiter = _RateLimiter(rate_limit)
 
-        composite = _pd.DataFrame()
+        def fetch(security_dict):
+            limiter.wait()
+            started = _time.perf_counter()
+            try:
+                data, error = self._fetch_series(security=security_dict, ts_type=ts_types, date_range=date_range), None
+            except Exception as e:
+                data, error = None, repr(e)
+
+            return data, {'security': list(security_dict.values())[0], 'vwd_id': list(security_dict.keys())[0],
+                          'seconds': round(_time.perf_counter() - started, 3),
+                          'rows': 0 if data is None else len(data[ts_types[0]].index), 'error': error}
+
+        with _ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = list(executor.map(fetch, securities))
 
-        for security_dict in securities:
-            data = self.single_series(security=security_dict, ts_type=ts_type, date_range=date_range)
-            composite = _pd.concat([composite,data],axis=1)
+        self.comp_report = _pd.DataFrame([report for _, report in results],
+                                         columns=['security', 'vwd_id', 'seconds', 'rows', 'error'])
+        failed = self.comp_report['error'].notna().sum()
+        if failed:
+            print(failed, 'out of', len(securities), 'series failed, see comp_report')
 
-        return composite
+        panels = {t: _assemble_panel([data[t] for data, _ in results if data is not None and len(data[t].index)])
+                  for t in ts_types}
+
+        return panels[ts_type] if isinstance(ts_type, str) else panels
 
     # --------------------------------------------------------------------------------------------------------------
     def single_series(self, security, ts_type='price', date_range={'range':None,'auto':'P1Y'}):
@@ -143,31 +307,41 @@ class DeGiro():
         Returns price or volume data for a single security given a date range.
         range: e.g. '2019-01-01:2020-12-31'
         auto: e.g.  any of the shortcuts such as 'P1Y'
-        ts_type: 'price' | 'volume'
+        ts_type: 'price' | 'volume' | a list of both, returned as {ts_type: df}
         security: {'vwd_id':'security_name'}
         '''
 
         try:
-            user_token = self.credentials['user_token']
-            time_period = self._get_time_period(date_range)
+            return self._fetch_series(security=security, ts_type=ts_type, date_range=date_range)
+        
+        except Exception as e:
+            print(list(security.values())[0], e.args)
 
-            # Unpack dictionary (single key-value pair)
-            security_id = list(security.keys())[0]
-            security_name = list(security.values())[0]
+    # --------------------------------------------------------------------------------------------------------------
+    def _fetch_series(self, security, ts_type='price', date_range={'range':None,'auto':'P1Y'}):
+        '''
+        single_series without the error handling: raises on failed requests or responses.
+        '''
+        ts_types = [ts_type] if isinstance(ts_type, str) else list(ts_type)
+        time_period = self._get_time_period(dict(date_range))
 
-            url = 'https://charting.vwdservices.com/hchart/v1/deGiro/data.js?'+\
-                'resolution=P1D&culture=en-US&'+time_period+'&series=issueid%3A'+security_id+\
-                '&series='+ts_type+'%3Aissueid%3A'+security_id+'&format=json&userToken='+user_token
-            
+        # Unpack dictionary (single key-value pair)
+        security_id = list(security.keys())[0]
+        security_name = list(security.values())[0]
 
-            data = _json.loads(_requests.get(url).content)['series']
-            ts = self._transform_time_series_response(data=data, column_name=security_name)
-            ts.index = _pd.to_datetime(ts.index)
+        url = 'https://charting.vwdservices.com/hchart/v1/deGiro/data.js?'+\
+            'resolution=P1D&culture=en-US&'+time_period+'&series=issueid%3A'+security_id+\
+            ''.join('&series='+t+'%3Aissueid%3A'+security_id for t in ts_types)+'&format=json&userToken='
 
-            return ts
-        
-        except Exception as e:
-            print(list(security.values())[0], e.args)
+        response = self._get_authorized(lambda credentials: url + credentials['user_token'])
+        data = _json.loads(response.content)['series']
+        ts = self._transform_time_series_response(data=data, column_name=security_name, ts_types=ts_types)
+
+        # Keep track of what each request transferred
+        self.transfer_log.append({'security': security_name, 'period': time_period,
+                                  'bytes': len(response.content), 'rows': len(ts[ts_types[0]].index)})
+
+        return ts[ts_type] if isinstance(ts_type, str) else ts
     
     # --------------------------------------------------------------------------------------------------------------
     def _get_time_period(self, date_range):
@@ -186,52 +360,42 @@ class DeGiro():
         return time_period
 
     # --------------------------------------------------------------------------------------------------------------
-    def _transform_time_series_response(self, data, column_name):
-        ''' '''
-        # Use isin if there's no column name
-        # if column_name is None:
-        #    column_name = data[0]['data']['isin']
-
-        # first, last index -> get first and last index items to generate a series of time representation
-        index_first = data[1]['data'][0][0]
-        index_last = data[1]['data'][-1][0]
-        time_index = [i for i in range(index_first, index_last+1)]
-
-        # first, last date -> get first and last date to generate the date range
-        date_first = _datetime.strptime(data[0]['data']['windowFirst'][:10],'%Y-%m-%d')
-        date_last = _datetime.strptime(data[0]['data']['windowLast'][:10],'%Y-%m-%d')
-        dates_series = _pd.date_range(date_first, date_last, freq='1D')
+    def _transform_time_series_response(self, data, column_name, ts_types=None):
+        '''
+        Decode a vwd chart payload: data[0] holds the window, data[1:] one [offset, value] list per
+        requested series. Offsets are days counted from the first point of data[1], dated windowFirst.
+        Returns a single column (column_name) df of data[1] or, given ts_types, {ts_type: df} for
+        every series of the payload.
+        '''
+        window_first = _np.datetime64(data[0]['data']['windowFirst'][:10], 'D')
+        first_offset = data[1]['data'][0][0] if data[1]['data'] else 0
 
-        # Construct df of dates and time
-        df_time = _pd.DataFrame(index = time_index, data = dates_series, columns=['Dates'])
+        frames = [_vwd_series_frame(series['data'], window_first, first_offset, column_name)
+                  for series in data[1:]]
 
-        # Construct df of price or volume data
-        df_data = _pd.DataFrame(data[1]['data'], columns = ['demo_index',column_name]).set_index('demo_index')
+        if ts_types is None:
+            return frames[0]
 
-        # Merge the stuff
-        ts = _pd.concat([df_time, df_data], axis=1).set_index('Dates').dropna()
+        return dict(zip(ts_types, frames))
 
-        return ts
-    
     # --------------------------------------------------------------------------------------------------------------
     def search_degiro(self, searchTerm, search_limit=30, product_type='All'):
     
         try:
-            product_search_url = self.credentials['product_search_url']+self._SRCH_URL
-            account = self.credentials['account_id']
-            secID = self.credentials['session_id']
-            search_url_base = product_search_url+account+'&sessionId='+secID
-
             if product_type == 'All':
-                search_url = search_url_base+'&limit='+str(search_limit)+'&searchText='+searchTerm
+                search_params = '&limit='+str(search_limit)+'&searchText='+searchTerm
 
             else:
                 product_mapping = {'ETFs':'131','Stocks':'1'}
             
-                search_url = search_url_base+'&productTypeId='+product_mapping[product_type]+\
+                search_params = '&productTypeId='+product_mapping[product_type]+\
                             '&limit='+str(search_limit)+'&searchText='+searchTerm
 
-            search_results = _requests.get(search_url)
+            def search_url(credentials):
+                return credentials['product_search_url']+self._SRCH_URL+credentials['account_id']+\
+                    '&sessionId='+credentials['session_id']+search_params
+
+            search_results = self._get_authorized(search_url)
             return _json.loads(search_results.content)
             
         except Exception as e:
@@ -1,9 +1,13 @@
 import pandas as _pd
-import requests as _requests
-from bs4 import BeautifulSoup as _bs
+from ._http import http_client as _http
+from bs4 import BeautifulSoup as _bs, SoupStrainer as _SoupStrainer
 
 # ---------------------------------------------------------------------------------------------------
 # Constants
+_SUMMARY_URL = 'https://markets.ft.com/data/etfs/tearsheet/summary?s={}'
+
+_HOLDINGS_URL = 'https://markets.ft.com/data/etfs/tearsheet/holdings?s={}'
+
 _summary_columns = ['ISIN','AUM','ExpRatio','Currency','Domicile','Launch']
 
 _sectors = ['Technology','Financial Services','Healthcare','Consumer Cyclical','Industrials',
@@ -27,9 +31,10 @@ def ft_aggregate(etfs_list, how_securities=_top_10[0]):
     for count, etf in enumerate(etfs_list):
         
         try:
-            x1 = ft_summary(etf).fillna('-')
-            x2 = ft_sectors(etf).fillna(0).astype(float).round(3).astype(str)
-            x3 = ft_securities(etf).fillna(0).astype(float).round(3).astype(str)
+            x1, x2, x3 = ft_fund(etf)
+            x1 = x1.fillna('-')
+            x2 = x2.fillna(0).astype(float).round(3).astype(str)
+            x3 = x3.fillna(0).astype(float).round(3).astype(str)
 
             if how_securities == _top_10[0]:
                 x3 = x3[_top_10+[_unidentified[1]]]
@@ -45,31 +50,23 @@ def ft_aggregate(etfs_list, how_securities=_top_10[0]):
     return df.fillna('-1')
 
 
+# ---------------------------------------------------------------------------------------------------
+def ft_fund(etf):
+    """
+    Summary, sectors and securities of an etf from one request per tearsheet page (summary and
+    holdings), each parsed once.
+    """
+    labels = _table_labels(_fetch_rows(_SUMMARY_URL.format(etf)))
+    holdings = _holdings_df(_fetch_rows(_HOLDINGS_URL.format(etf)))
+
+    return _summary_df(labels, etf), _sectors_df(holdings, etf), _securities_df(holdings, etf)
+
 # ---------------------------------------------------------------------------------------------------
 def ft_summary(etf):
     """ """
     
     try:
-        res = _requests.get("https://markets.ft.com/data/etfs/tearsheet/summary?s={}".format(etf))
-        table = _bs(res.content, 'html.parser').find_all('tr')
-
-        # Assign data
-        ft_data = _pd.DataFrame(index=[etf],
-                           columns=_summary_columns)
-        
-        ft_data.loc[etf]['ISIN'] = _parse_table(table,'ISIN')
-        ft_data.loc[etf]['AUM'] = _parse_table(table,'Fund size')
-        
-        try:
-            ft_data.loc[etf]['ExpRatio'] = _transform_exp(_parse_table(table,'Ongoing charge'))
-        except:
-            ft_data.loc[etf]['ExpRatio'] = _transform_exp(_parse_table(table,'Net expense ratio'))
-            
-        ft_data.loc[etf]['Currency'] = _parse_table(table,'Price currency')
-        ft_data.loc[etf]['Domicile'] = _parse_table(table,'Domicile')
-        ft_data.loc[etf]['Launch'] = _parse_table(table,'Launch date')
-        
-        return ft_data
+        return _summary_df(_table_labels(_fetch_rows(_SUMMARY_URL.format(etf))), etf)
 
     except Exception as e:
         print(e.args)
@@ -79,13 +76,7 @@ def ft_sectors(etf):
     """ """
     
     try:
-        res = _requests.get('https://markets.ft.com/data/etfs/tearsheet/holdings?s={}'.format(etf))
-        soup = _bs(res.content, 'html.parser').find_all('tr')
-
-        sup_df = _pd.DataFrame([[weight.text for weight in item.find_all('td')] for item in soup]
-                             ).dropna(how='all').set_index([0])
-
-        return _transform_sectors(sup_df, col_name = etf).T
+        return _sectors_df(_holdings_df(_fetch_rows(_HOLDINGS_URL.format(etf))), etf)
     
     except Exception as e:
         print(e.args)
@@ -95,41 +86,84 @@ def ft_securities(etf):
     """ """
     
     try:
-        res = _requests.get('https://markets.ft.com/data/etfs/tearsheet/holdings?s={}'.format(etf))
-        soup = _bs(res.content, 'html.parser').find_all('tr')
-
-        sup_df = _pd.DataFrame([[weight.text for weight in item.find_all('td')] for item in soup]
-                             ).dropna(how='all').set_index([0])
-        
-        dt = _transform_securities(sup_df, col_name=etf)
-        
-        # Calc top-10 sum
-        dt.loc[_top_10[0]] = dt.drop([_unidentified[1]]).sum()
-        
-        return dt.T
+        return _securities_df(_holdings_df(_fetch_rows(_HOLDINGS_URL.format(etf))), etf)
     
     except Exception as e:
         print(e.args)
 
 # ---------------------------------------------------------------------------------------------------
-def _parse_table(table, filtered_value):
+def _fetch_rows(url):
+    """ Download a tearsheet page and return the (header texts, cell texts) of every table row."""
+    res = _http.get(url)
+    rows = _bs(res.content, 'lxml', parse_only=_SoupStrainer('tr')).find_all('tr')
+
+    return [([th.text for th in row.find_all('th')], [td.text for td in row.find_all('td')]) for row in rows]
+
+# ---------------------------------------------------------------------------------------------------
+def _table_labels(rows):
+    """ {row header: cell texts} of the rows with a header, first occurrence of a header kept."""
+    labels = {}
+
+    for headers, cells in rows:
+        for header in headers:
+            labels.setdefault(header.strip(), cells)
+
+    return labels
+
+# ---------------------------------------------------------------------------------------------------
+def _holdings_df(rows):
+    """ Cell texts of the holdings page rows indexed by their first cell."""
+    return _pd.DataFrame([cells for _, cells in rows]).dropna(how='all').set_index([0])
+
+# ---------------------------------------------------------------------------------------------------
+def _summary_df(labels, etf):
+    """ One row df of _summary_columns from the summary page labels."""
+    try:
+        exp_ratio = _transform_exp(_parse_table(labels, 'Ongoing charge'))
+    except:
+        exp_ratio = _transform_exp(_parse_table(labels, 'Net expense ratio'))
+
+    return _pd.DataFrame([[_parse_table(labels, 'ISIN'),
+                           _parse_table(labels, 'Fund size'),
+                           exp_ratio,
+                           _parse_table(labels, 'Price currency'),
+                           _parse_table(labels, 'Domicile'),
+                           _parse_table(labels, 'Launch date')]],
+                         index=[etf], columns=_summary_columns, dtype=object)
+
+# ---------------------------------------------------------------------------------------------------
+def _sectors_df(holdings, etf):
+    """ """
+    return _transform_sectors(holdings, col_name = etf).T
+
+# ---------------------------------------------------------------------------------------------------
+def _securities_df(holdings, etf):
+    """ """
+    dt = _transform_securities(holdings, col_name=etf)
+
+    # Calc top-10 sum
+    dt.loc[_top_10[0]] = dt.drop([_unidentified[1]]).sum()
+
+    return dt.T
+
+# ---------------------------------------------------------------------------------------------------
+def _parse_table(labels, filtered_value):
     """ """
     
     try:
         
-        result = list(filter(lambda x: list(filter(lambda t: t.text.strip() == filtered_value, 
-                                                       x.find_all('th'))),table))
+        result = labels[filtered_value]
 
         if filtered_value in ['Fund size']:    
-            aum_size = result[0].find_all('td')[0].text.split(" ")[0]
-            curr = result[0].find_all('td')[0].text.split(" ")[1][:3]
+            aum_size = result[0].split(" ")[0]
+            curr = result[0].split(" ")[1][:3]
             result = curr+' '+_transform_aum(aum_size)
 
         elif filtered_value in ['ISIN','Price currency','Domicile','Ongoing charge','Net expense ratio']:
-            result = result[0].find_all('td')[0].text.split(" ")[0]
+            result = result[0].split(" ")[0]
 
         elif filtered_value in ['Launch date']:
-            result = result[0].find_all('td')[0].text
+            result = result[0]
 
         else:
             print(filtered_value + ' -- not found.')
@@ -156,6 +190,32 @@ def _transform_exp(string_val):
     """ """
     return float(string_val.split("%")[0])
 
+# ---------------------------------------------------------------------------------------------------
+def _parse_number(value):
+    """
+    Float of a scraped value, None for missing values ('-', NaN and the '-1' placeholder of
+    legacy text rows; a numeric -1 is kept).
+    """
+    if isinstance(value, str) and value.strip() == '-1':
+        return None
+
+    try:
+        number = float(value)
+        return None if number != number else number
+
+    except (TypeError, ValueError):
+        return None
+
+# ---------------------------------------------------------------------------------------------------
+def _parse_aum(value):
+    """ Split a fund size such as 'GBP 1.23bn' or 'USD <0.05bn' into (1.23, 'GBP'), (None, None) if missing."""
+    try:
+        currency, amount = str(value).split(' ', 1)
+        return float(amount.replace('<', '').replace('bn', '').strip()), currency
+
+    except ValueError:
+        return None, None
+
 # ---------------------------------------------------------------------------------------------------
 def _transform_sectors(df, col_name):
     """ """
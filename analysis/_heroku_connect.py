@@ -1,374 +1,277 @@
 import psycopg2 as _psycopg2
+import psycopg2.extras as _extras
+import psycopg2.pool as _pool
+import psycopg2.extensions as _extensions
+import threading as _threading
+import time as _time
+import re as _re
+from contextlib import contextmanager as _contextmanager
 import pandas as _pd
-import requests as _requests
-from ._ft_market_data import ft_aggregate, ft_summary, ft_sectors, ft_securities
-from ._sql_statements import *
-from ._utilities import _convert_df_to_str, _convert_str_to_df
-from ._portfolio import Portfolio
-from ._yields_data import update_govt_yields
-class HerokuDB:
+from ._storage import QlabDB
+from ._notifications import ChangeListener, CHANGES_CHANNEL, _change_payloads
+
+# Return numeric columns (e.g. transaction_price) as float instead of Decimal; date columns
+# already arrive as datetime.date
+_NUMERIC_AS_FLOAT = _extensions.new_type(_extensions.DECIMAL.values, 'NUMERIC_AS_FLOAT',
+                                         lambda value, cur: float(value) if value is not None else None)
+
+# --------------------------------------------------------------------------------------------
+def _values_template(query):
+    """
+    Split a single-row 'VALUES (%s, ...)' statement into the 'VALUES %s' form used by
+    execute_values and its row template. Statements already in that form are returned as is.
+    """
+    match = _re.search(r'VALUES\s*(\([^)]*\))', query)
+
+    if match is None:
+        return query, None
+
+    return query[:match.start()] + 'VALUES %s' + query[match.end():], match.group(1)
+
+
+class HerokuDB(QlabDB):
     
-    def __init__(self, uri, local_mode=False):
+    def __init__(self, uri, local_mode=False, prices_layout='blob', blob_codec='json', mirror_dir=None,
+                 min_conn=None, max_conn=None, query_cache=None, slow_query_ms=None, pool_timeout=60):
+        """
+        PostgreSQL (Heroku) backend. See QlabDB for prices_layout, blob_codec, mirror_dir,
+        query_cache and slow_query_ms.
+        min_conn, max_conn: set max_conn to use a thread-safe connection pool instead of a single
+        connection; every call then checks out its own connection and cursor, waiting up to
+        pool_timeout seconds when all max_conn connections are in use
+        """
+        super().__init__(prices_layout=prices_layout, blob_codec=blob_codec, mirror_dir=mirror_dir,
+                         query_cache=query_cache, slow_query_ms=slow_query_ms)
         self.uri = uri
         self._conn = None
-        self._cur = None
-        self.url = 'https://trader.degiro.nl/product_search/config/dictionary'
         self.local_mode = local_mode
+        self.min_conn = min_conn if min_conn is not None else 1
+        self.max_conn = max_conn
+        self.pool_timeout = pool_timeout
+        self._pool = None
+        self._pool_slots = None
+        self._lock = _threading.RLock()
     
     # --------------------------------------------------------------------------------------------
     def connect(self):
         '''
-        Connect to herokuDB based on the provided uri. Return connection and cursor.
+        Connect to herokuDB based on the provided uri. Return connection and cursor (or create a
+        connection pool if max_conn is set).
         '''
         try:
-            if self.local_mode:
-                self._conn = _psycopg2.connect(self.uri)
+            kwargs = self._connect_kwargs()
+
+            if self.max_conn is not None:
+                self._pool = _pool.ThreadedConnectionPool(self.min_conn, self.max_conn, self.uri, **kwargs)
+                # getconn raises instead of waiting once max_conn connections are checked out
+                self._pool_slots = _threading.BoundedSemaphore(self.max_conn)
+                print('Connected to DB, pool of up to', self.max_conn, 'connections is created')
 
             else:
-                self._conn = _psycopg2.connect(self.uri, sslmode='require')
-                
-            self._conn.set_session(autocommit=True)
-            self._cur = self._conn.cursor()
-            print('Connected to DB, cursor is created')
+                self._conn = _psycopg2.connect(self.uri, **kwargs)
+                self._conn.set_session(autocommit=True)
+                _extensions.register_type(_NUMERIC_AS_FLOAT, self._conn)
+                print('Connected to DB')
         
         except Exception as e:
             print(e.args)
     
+    # --------------------------------------------------------------------------------------------
+    def _connect_kwargs(self):
+        return {} if self.local_mode else {'sslmode': 'require'}
+
     # --------------------------------------------------------------------------------------------
     def close(self):
         '''
-        Close connection to herokuDB.
+        Close connection (or every pooled connection) to herokuDB.
         '''
         try:
-            if self._conn != None:
+            if self._pool != None:
+                self._pool.closeall()
+                self._pool = None
+                print('Connection pool closed')
+
+            elif self._conn != None:
                 self._conn.close()
-                # Update conn and cur as connection is now closed
-                self._conn, self._cur = None, None 
+                self._conn = None
                 print('Connection closed')
             else:
                 print('No connection is available')
                 
         except Exception as e:
             print(e.args)
-            
+
     # --------------------------------------------------------------------------------------------
-    def execute_sql(self,query,data=None):
+    @_contextmanager
+    def _checkout(self):
         '''
-        Execute an sql query. Data must be a tuple, e.g. (value,) or (value_1, value_2).
+        Yield a connection for exclusive use: a pooled connection returned to the pool afterwards
+        (waiting for a free one when all are in use), or the single connection held under a lock.
         '''
-        try:
-            if self._cur != None:
-                self._cur.execute(query,data)
-                print('Query executed', end = "\r")
-            else:
-                print('Cursor is not available')
-            
-        except Exception as e:
-            print(e.args)
-            
-    # --------------------------------------------------------------------------------------------
-    def clean_degiro_search(self, search_results):
-        """
-        Return a cleaned dictionary.
-        """
-        if 'vwdIdSecondary' not in search_results:
-            search_results['vwdIdSecondary'] = -1
+        if self._pool is not None:
+            if not self._pool_slots.acquire(timeout=self.pool_timeout):
+                raise ConnectionError('No pooled connection available after', self.pool_timeout, 'seconds')
 
-        if 'vwdId' not in search_results:
-            search_results['vwdId'] = -1
-
-
-        clean_data = (search_results['id'],search_results['name'],search_results['isin'],\
-                      search_results['vwdId'],search_results['symbol'],search_results['productType'],\
-                      search_results['productTypeId'],search_results['currency'],\
-                      search_results['exchangeId'],search_results['vwdIdSecondary'])
+            try:
+                conn = self._pool.getconn()
+                try:
+                    conn.autocommit = True
+                    _extensions.register_type(_NUMERIC_AS_FLOAT, conn)
+                    yield conn
+                finally:
+                    self._pool.putconn(conn)
+            finally:
+                self._pool_slots.release()
+
+        elif self._conn is not None:
+            with self._lock:
+                yield self._conn
 
-        return clean_data
-    
-    # --------------------------------------------------------------------------------------------
-    def fetch(self,index_name=None,limit=10000):
-        """Fetch table data as Pandas DataFrame."""
-        try:
-            records = self._cur.fetchmany(limit)
-            
-            col_names = [elt[0] for elt in self._cur.description]
-            df = _pd.DataFrame(records, columns = col_names)
+        else:
+            raise ConnectionError('Connection is not available')
 
-            # fix for transactions so that they are ordered by id
-            if 'id' in df.columns:
-                df = df.sort_values(by='id')
-                df.index = [i for i in range(len(df.index))]
-                
-            if index_name is None:
-                return df
-            
-            else:
-                return df.set_index(index_name)
-        
-        except Exception as e:
-            print(e.args)
-   
     # --------------------------------------------------------------------------------------------
-    def print_tables(self):
-        """Print database table names."""
-        try:
-            sql_print_tables_query = ("""
-                                      SELECT table_name
-                                      FROM information_schema.tables
-                                      WHERE table_schema = 'public'
-                                  """)
-            self.execute_sql(query=sql_print_tables_query,data=None)
-            
-            for table in self._cur.fetchall():
-                self.execute_sql("""SELECT COUNT(*) FROM {}""".format(table[0]))
-                print('Table: ', table[0], '--- rows:', str(self.fetch().iloc[0][0]))
-        
-        except Exception as e:
-            print(e.args)
-     
-    # --------------------------------------------------------------------------------------------
-    def load_dg_exchange_ids(self):
-        """
-        Uses a url link to load exchanges details to a table. You should run this only once.
-        """
-        self.execute_sql(query=sql_exchanges_table_create,data=None)
-        res = _requests.get(self.url).json()
-        
-        for e in res['exchanges']:
-            d = {}
-            for item in ['id','hiqAbbr','country','city','name']:
-                try: d[item] = e[item]
-                except: d[item] = '-1'
-
-            exchange_details = (d['id'], d['hiqAbbr'], d['country'], d['city'], d['name'])
-            self.execute_sql(query=sql_exchange_insert_query,data=exchange_details)
-    
-    # --------------------------------------------------------------------------------------------
-    def load_ft_funds_data(self, etfs_list=None):
-        """ """
-        
-        if etfs_list is None:
-            
-            # Join tables to read FT funds codes
-            self.execute_sql(sql_join_3)
-            joined_df = self.fetch(index_name='exchange_id')
+    def _query(self, query, data=None, index_name=None):
+        '''
+        Execute an sql query and return its rows as a DataFrame (None if the query returns no
+        rows, e.g. an insert). Thread-safe: runs on its own cursor of a checked-out connection.
+        '''
+        with self._checkout() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, data)
 
-            # Create list of funds to get FT data for
-            etfs_list = list(map(lambda x: x[0]+':'+x[1]+':'+x[2], joined_df[['symbol','ft_exch_code','currency']].values))
+                if cur.description is None:
+                    return None
 
-        # Read data from FT site
-        funds_data = ft_aggregate(etfs_list).T.fillna(0)
-        
-        # Index to column, erm in the right order
-        funds_data['index'] = funds_data.index
-        funds_data = _pd.concat([funds_data['index'],
-                                 funds_data.drop(['index'],axis=1)] ,axis=1)
-        
-        # Create or update relevant DB TABLE (etfs_data)
-        self.execute_sql(query=sql_etfs_data_table_create)
-        
-        # Add row to table (first convert all the data to type string)
-        for etf in etfs_list:
+                return self._records_to_df(cur.fetchall(), cur.description, index_name)
             
-            self.execute_sql(query=sql_etfs_data_insert_query,
-                             data=tuple(funds_data.loc[etf].astype(str)) )
-        
     # --------------------------------------------------------------------------------------------
-    def prices_table_update_auto(self, period='P1M', dg=None, assets_list=None):
-        """
-        Retrieves time series data and adds them to the prices table. If there is an assets list, only these assets are updated.
-        """
+    def _execute_sql(self,query,data=None):
+        '''
+        Execute an sql query. Data must be a tuple, e.g. (value,) or (value_1, value_2).
+        Runs on its own cursor of a checked-out connection; the rows are kept per thread for a
+        subsequent fetch().
+        '''
+        self._local.result = None
 
-        if assets_list is None:
-            # Retrieve vwd ids / symbols from securities tables
-            self.execute_sql("SELECT vwd_id, symbol FROM securities WHERE product_type = 'ETF' ")
-            
-            # Pass the ids / symbols to get price time series
-            data = dg.comp_series(securities=dg._securities_dict(self.fetch()),
-                            ts_type='price',
-                            date_range={'auto':period})
-            
-            # Update the prices table using the prices data from degiro
-            self.prices_table_update_manual(df=data.copy())
-        
-        else:
-            for asset in assets_list:
-                # Retrieve vwd ids / symbols from securities tables
-                self.execute_sql("SELECT vwd_id, symbol FROM securities WHERE symbol = '{}' ".format(asset))
-
-                # Pass the ids / symbols to get price time series
-                data = dg.comp_series(securities=dg._securities_dict(self.fetch()),
-                                ts_type='price',
-                                date_range={'auto':period})
-                
-                # Update the prices table using the prices data from degiro
-                self.prices_table_update_manual(df=data.copy())
+        with self._checkout() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query,data)
+                self._local.result = (cur.fetchall(), cur.description) if cur.description else None
 
     # --------------------------------------------------------------------------------------------
-    def prices_table_update_manual(self, df):
-        """ """
-        for asset in df.columns:
-
-            # First read existing data:
-            try:
-                # if asset is in table you'll be able to read
-                existing_data = self.prices_table_read(assets_list=[asset])
-            except:
-                # Otherwise pass an empty df back
-                existing_data = _pd.DataFrame()
-
-            # Then use combine_first to upsert data to existing df
-            df_combined = _pd.DataFrame(df[asset]).combine_first(existing_data)
-
-            # ..and convert the combined df to string
-            prices_as_string = _convert_df_to_str(df_combined, column=asset)
-
-            # Finally save the string to the table
-            self.execute_sql(query = sql_prices_insert_query, data=(asset, prices_as_string))
-    
+    def _execute_values(self, query, rows, page_size=1000):
+        '''
+        Execute a multi-row sql query. Query must contain a single VALUES %s placeholder and rows
+        must be a list of tuples.
+        '''
+        with self._checkout() as conn:
+            with conn.cursor() as cur:
+                _extras.execute_values(cur, query, rows, page_size=page_size)
+            
     # --------------------------------------------------------------------------------------------
-    def rates_table_update(self, df=None):
-        """ Update rates table with df or auto (if df is None)"""
+    def _bulk_write(self, query, rows, page_size=1000):
+        '''
+        Write rows with batched multi-row inserts in a single transaction, rolled back on failure.
+        query: single-row statement, e.g. sql_exchange_insert_query, or a VALUES %s statement
+        rows: list of tuples
+        Return a summary dict with rows written, pages (round-trips) and seconds.
+        '''
+        query, template = _values_template(query)
+        summary = {'rows': len(rows), 'pages': -(-len(rows)//page_size), 'seconds': 0.0}
+        started = _time.perf_counter()
 
-        if df is None:
-            df = update_govt_yields()
+        try:
+            with self._checkout() as conn:
+                conn.autocommit = False
+                try:
+                    with conn.cursor() as cur:
+                        _extras.execute_values(cur, query, rows, template=template, page_size=page_size)
+                    conn.commit()
 
-        for item in df.columns:
+                except Exception:
+                    conn.rollback()
+                    raise
 
-            # First read existing data:
-            try:
-                # if item is in table you'll be able to read
-                existing_data = self.rates_table_read(rate=item)
-            except:
-                # Otherwise pass an empty df back
-                existing_data = _pd.DataFrame()
+                finally:
+                    conn.autocommit = True
 
-            # Then use combine_first to upsert data to existing df
-            df_combined = _pd.DataFrame(df[item]).combine_first(existing_data)
+        except Exception as e:
+            summary['rows'], summary['error'] = 0, e.args
+            print(e.args)
 
-            # ..and convert the combined df to string
-            items_as_string = _convert_df_to_str(df_combined, column=item)
+        summary['seconds'] = round(_time.perf_counter() - started, 3)
 
-            # Finally save the string to the table
-            self.execute_sql(query = sql_rates_insert_query, data=(item, items_as_string))
+        return summary
 
     # --------------------------------------------------------------------------------------------
-    def rates_table_read(self, term_spread=False, rate=None):
-        """ Read from rates table"""
-        try:
-            if rate is None:
-                query = "SELECT * FROM rates"
-            else:
-                query = "SELECT * FROM rates WHERE symbol = '{}'".format(rate)
+    def fetch_chunks(self, query, data=None, chunksize=50000):
+        """
+        Run a query on a named (server-side) cursor and yield its rows as DataFrames of at most
+        chunksize rows, so large results are processed with bounded memory (one empty DataFrame
+        with the query's columns, taken from the cursor description, if it returns no rows). The
+        connection is held until the generator is exhausted or closed.
+        """
+        with self._checkout() as conn:
+            conn.autocommit = False
+            cur = conn.cursor(name='qlab_stream_{}'.format(next(self._cursor_ids)))
+            cur.itersize = chunksize
 
-            # Fetch data and create a data frame
-            self.execute_sql(query)
-            df = self.fetch()
-            df = df.set_index('symbol').T
+            try:
+                cur.execute(query, data)
 
-            results = _pd.DataFrame()
+                empty = True
 
-            # Unpack data and move them to a dataframe
-            for item in df.columns:
-                values = df.loc['data',item]
-                rates_as_df = _convert_str_to_df(values, item)
-                results = _pd.concat([results,rates_as_df],axis=1)
+                while True:
+                    records = cur.fetchmany(chunksize)
+                    if not records:
+                        break
 
-            if term_spread:
-                # Create arrays for the features and the response variable
-                results['US_2Y_3M']  = results['US_2Y']  - results['US_3M']
-                results['US_10Y_3M'] = results['US_10Y'] - results['US_3M']
-                results['US_10Y_2Y'] = results['US_10Y'] - results['US_2Y']
-                results['US_30Y_5Y'] = results['US_30Y'] - results['US_5Y']
+                    empty = False
+                    yield _pd.DataFrame(records, columns=[elt[0] for elt in cur.description])
 
-                results['GE_2Y_3M']  = results['GE_2Y']  - results['EA_3M']
-                results['GE_10Y_3M'] = results['GE_10Y'] - results['EA_3M']
-                results['GE_10Y_2Y'] = results['GE_10Y'] - results['GE_2Y']
-                results['GE_30Y_5Y'] = results['GE_30Y'] - results['GE_5Y']
+                if empty:
+                    yield _pd.DataFrame(columns=[elt[0] for elt in cur.description])
 
-            return results
+            finally:
+                cur.close()
+                conn.rollback()
+                conn.autocommit = True
 
-        except Exception as e:
-            print(e.args)
-            
     # --------------------------------------------------------------------------------------------
-    def _read_price_time_series_data(self, assets_list=None, portfolio=True):
-        """ """
-        try:
-            if assets_list is None:
-                # Use all available symbols in the prices table
-                query = 'SELECT * FROM prices'
+    def _notify_change(self, namespace, symbols):
+        """ NOTIFY listeners of CHANGES_CHANNEL with the written namespace and symbols."""
+        for payload in _change_payloads(namespace, symbols):
+            self.execute_sql('SELECT pg_notify(%s, %s)', (CHANGES_CHANNEL, payload))
 
-            else:
-                # Use the passed list to filter the prices table
-                if len(assets_list) == 1:
-                    query = "SELECT * FROM prices WHERE symbol = '{}'".format(assets_list[0])
-                else:
-                    query = "SELECT * FROM prices WHERE symbol IN {}".format(tuple(assets_list))
-            
-            # Fetch data and create a data frame
-            self.execute_sql(query=query)
-            df = self.fetch()
-            df = df.set_index('symbol').T
-
-            results = _pd.DataFrame()
+    # --------------------------------------------------------------------------------------------
+    def listen(self, callback=None):
+        """
+        Subscribe to prices, rates and transactions written by any process. For every change the
+        query cache (and the PORT cache for prices/transactions) is invalidated, then
+        callback(namespace, symbols) runs on the listener thread (namespace and symbols are None
+        after a reconnect). Return the started ChangeListener, stop() it to unsubscribe.
+        """
+        def on_change(namespace, symbols):
+            if self.query_cache is not None:
+                self.query_cache.invalidate(self._changed_tables(namespace))
 
-            # Unpack data and move them to a dataframe
-            for asset in df.columns:
-                values = df.loc['data',asset]
-                prices_as_df = _convert_str_to_df(values, asset)
-                results = _pd.concat([results,prices_as_df],axis=1)
+            if namespace in (None, 'prices', 'transactions'):
+                self._port_cache = (None, None)
 
-            return results
+            if callback is not None:
+                callback(namespace, symbols)
 
-        except Exception as e:
-            print(e.args)
-    
-    # --------------------------------------------------------------------------------------------
-    def prices_table_read(self, assets_list=None, portfolio=True, cash=100000):
-
-        results = self._read_price_time_series_data(assets_list=assets_list, portfolio=portfolio)
-        if 'CASH' not in results.columns:
-            results['CASH'] = cash
-        if portfolio:
-                port = Portfolio(heroku_conn=self).fetch_data()
-                results = _pd.concat([results, port['PORT']],axis=1)
-        
-        return results.ffill()
+        return ChangeListener(self.uri, on_change, connect_kwargs=self._connect_kwargs()).start()
 
     # --------------------------------------------------------------------------------------------
-    def insert_new_asset(self, dg_search_result=None, asset=None, asset_segment=None, ft_suffix=None, dg=None):
-        """Provide all 5 arguments to call this functions"""
-        if all(i is not None for i in [dg_search_result, asset, asset_segment, ft_suffix, dg]):
-            
-            # Insert new security to <<securities>> table
-            self.execute_sql(sql_security_insert_query,
-                             self.clean_degiro_search(dg_search_result))
+    def _changed_tables(self, namespace):
+        """ Tables written for a notified namespace (None: any table)."""
+        if namespace is None:
+            return None
 
-            # Insert segment for new security to <<market_segments>> table
-            self.execute_sql(sql_market_segments_insert_query,(asset,asset_segment))
+        if namespace == 'transactions':
+            return ['transactions']
 
-            # Insert price time series data to <<prices>> table
-            self.prices_table_update_auto(period='P50Y',dg=dg, assets_list=[asset])
-
-            # Scrap FT data and add to <<etfs_data>> table
-            self.load_ft_funds_data(etfs_list=[asset+':'+ft_suffix])
-
-        else:
-            print('Insert every argument to proceed.')
-    
-    # --------------------------------------------------------------------------------------------
-    def market_segments_info(self):
-
-        self.execute_sql("""SELECT securities.symbol, name, segment
-                            FROM securities
-                            JOIN market_segments
-                            ON securities.symbol=market_segments.symbol""")
-        ms = self.fetch()
-        ms.index = ms.symbol
-        ms.loc['PORT',:] = ['PORT','Portfolio','Portfolio']
-        ms.loc['CASH',:] = ['CASH','Cash','Cash']
-
-        return ms
-    
-    # --------------------------------------------------------------------------------------------
\ No newline at end of file
+        # Namespaces other than prices and rates live in the shared <<series>> table
+        return [self.series(namespace).table, 'prices_daily', 'series_meta']
@@ -0,0 +1,129 @@
+import random as _random
+import threading as _threading
+from urllib.parse import urlsplit as _urlsplit
+import pandas as _pd
+import requests as _requests
+from requests.adapters import HTTPAdapter as _HTTPAdapter
+from urllib3.util.retry import Retry as _Retry
+
+# Connect and read timeouts (seconds) used when a call does not pass its own
+_DEFAULT_TIMEOUT = (5, 30)
+
+# Throttling and transient server errors
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class _JitterRetry(_Retry):
+    '''
+    urllib3 Retry with full jitter: each backoff sleeps a random time up to the exponential delay.
+    '''
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return _random.uniform(0, backoff) if backoff > 0 else 0
+
+
+class HttpClient:
+    '''
+    Shared HTTP layer of the data fetchers (DeGiro, FT, iShares, FRED, Bundesbank): one pooled
+    keep-alive Session per host, default timeouts, retries with exponential backoff and jitter on
+    connection errors, 429 and 5xx, and per host counters of requests, retries and connection reuse.
+    '''
+
+    def __init__(self, retries=3, backoff_factor=0.5, pool_maxsize=16, timeout=_DEFAULT_TIMEOUT, gzip=True):
+        """
+        retries: attempts after the first one (connection errors and _RETRY_STATUSES)
+        backoff_factor: base of the exponential backoff (0.5 -> up to 0.5, 1, 2, ... seconds)
+        pool_maxsize: kept-alive connections per host (>= concurrent requests to a host)
+        gzip: ask for gzip/deflate compressed responses
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.gzip = gzip
+        self._sessions = {}
+        self._counters = {}
+        self._lock = _threading.Lock()
+
+    # --------------------------------------------------------------------------------------------
+    def session(self, url):
+        """ Return the Session of url's host, created on first use."""
+        host = '{0.scheme}://{0.netloc}'.format(_urlsplit(url))
+
+        with self._lock:
+            if host not in self._sessions:
+                retry = _JitterRetry(total=self.retries, backoff_factor=self.backoff_factor,
+                                     status_forcelist=_RETRY_STATUSES, raise_on_status=False)
+                adapter = _HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=self.pool_maxsize)
+
+                session = _requests.Session()
+                session.mount(host, adapter)
+                session.headers['Accept-Encoding'] = 'gzip, deflate' if self.gzip else 'identity'
+
+                self._sessions[host] = session
+                self._counters[host] = {'requests': 0, 'retries': 0, 'errors': 0}
+
+            return self._sessions[host]
+
+    # --------------------------------------------------------------------------------------------
+    def request(self, method, url, **kwargs):
+        """ Send a request through the host's Session (requests.request arguments)."""
+        session = self.session(url)
+        counters = self._counters['{0.scheme}://{0.netloc}'.format(_urlsplit(url))]
+        kwargs.setdefault('timeout', self.timeout)
+
+        try:
+            response = session.request(method, url, **kwargs)
+
+        except _requests.RequestException:
+            with self._lock:
+                counters['requests'] += 1
+                counters['errors'] += 1
+            raise
+
+        retries = getattr(response.raw, 'retries', None)
+        with self._lock:
+            counters['requests'] += 1
+            counters['retries'] += len(retries.history) if retries is not None else 0
+            counters['errors'] += response.status_code >= 400
+
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    # --------------------------------------------------------------------------------------------
+    def stats(self):
+        """
+        Return a df per host of requests, retries, error responses, connections opened and requests
+        served on an already open (kept-alive) connection.
+        """
+        records = []
+
+        with self._lock:
+            for host, session in self._sessions.items():
+                pools = session.get_adapter(host).poolmanager.pools
+                opened = sum(pools[key].num_connections for key in pools.keys())
+                served = sum(pools[key].num_requests for key in pools.keys())
+
+                records.append(dict(host=host, **self._counters[host], connections=opened,
+                                    reused=max(served - opened, 0)))
+
+        return _pd.DataFrame(records, columns=['host', 'requests', 'retries', 'errors',
+                                               'connections', 'reused']).set_index('host')
+
+    # --------------------------------------------------------------------------------------------
+    def close(self):
+        """ Close every Session and its connections."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions, self._counters = {}, {}
+
+
+# Client shared by every fetcher of the package
+http_client = HttpClient()
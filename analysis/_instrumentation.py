@@ -0,0 +1,147 @@
+import os as _os
+import re as _re
+import sys as _sys
+import threading as _threading
+from collections import deque as _deque
+import pandas as _pd
+
+# Literals and placeholder lists collapsed so that repeated statements share a template
+_STRING_LITERAL = _re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = _re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = _re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)')
+
+# Storage layer modules, skipped when looking for the code that issued a statement
+_PACKAGE_DIR = _os.path.dirname(_os.path.abspath(__file__))
+_STORAGE_MODULES = {'_storage.py', '_timeseries_store.py', '_heroku_connect.py', '_sqlite_connect.py',
+                    '_instrumentation.py'}
+
+
+def _sql_template(query):
+    """ Normalize a statement to its template: single spaces, literals and IN lists as ?."""
+    query = _STRING_LITERAL.sub('?', ' '.join(query.split()))
+    query = _NUMBER_LITERAL.sub('?', query)
+
+    return _PLACEHOLDER_LIST.sub('(?, ...)', query)
+
+
+def _frame_site(frame):
+    return '{}:{}:{}'.format(_os.path.basename(frame.f_code.co_filename), frame.f_code.co_name, frame.f_lineno)
+
+
+def _is_storage_frame(frame):
+    path = _os.path.abspath(frame.f_code.co_filename)
+    return _os.path.dirname(path) == _PACKAGE_DIR and _os.path.basename(path) in _STORAGE_MODULES
+
+
+def _payload_bytes(rows):
+    """ Rough size of the parameters sent with a multi-row write."""
+    return sum(len(v) if isinstance(v, (str, bytes, bytearray)) else 8 for row in rows for v in row)
+
+
+class QueryStats:
+    '''
+    Per-session query log: wall time, rows, payload bytes, caller and error of every statement
+    issued through a QlabDB, aggregated per sql template, with successful statements slower than
+    slow_ms printed. Failed statements are counted in errors, not in the time and row totals.
+    '''
+
+    def __init__(self, slow_ms=None, max_events=10000):
+        """
+        slow_ms: print statements taking longer than this many milliseconds (None to disable)
+        max_events: number of most recent statements kept in events
+        """
+        self.slow_ms = slow_ms
+        self.events = _deque(maxlen=max_events)
+        self.slow_queries = _deque(maxlen=max_events)
+        self._templates = {}
+        self._lock = _threading.Lock()
+
+    # --------------------------------------------------------------------------------------------
+    def record(self, kind, query, seconds, rows=None, nbytes=None, cached=False, error=None, depth=2):
+        """
+        Record one statement. error: the exception args of a failed statement.
+        depth: stack frames between the statement's site and this method. The caller is the first
+        frame outside the storage modules (e.g. a dashboard callback rather than
+        TimeSeriesStore.write); the immediate site is kept in the event's 'site'.
+        """
+        frame = _sys._getframe(depth)
+        site = _frame_site(frame)
+
+        outer = frame
+        while outer is not None and _is_storage_frame(outer):
+            outer = outer.f_back
+        caller = _frame_site(outer) if outer is not None else site
+
+        template = _sql_template(query)
+
+        event = {'kind': kind, 'template': template, 'seconds': seconds, 'rows': rows,
+                 'bytes': nbytes, 'cached': cached, 'error': error, 'caller': caller, 'site': site}
+
+        with self._lock:
+            self.events.append(event)
+
+            agg = self._templates.setdefault(template, {'calls': 0, 'cached': 0, 'errors': 0, 'seconds': 0.0,
+                                                        'max_seconds': 0.0, 'rows': 0, 'bytes': 0,
+                                                        'callers': set()})
+            agg['callers'].add(caller)
+
+            if error is not None:
+                agg['errors'] += 1
+                return
+
+            agg['calls'] += 1
+            agg['cached'] += cached
+            agg['seconds'] += seconds
+            agg['max_seconds'] = max(agg['max_seconds'], seconds)
+            agg['rows'] += rows or 0
+            agg['bytes'] += nbytes or 0
+
+            if self.slow_ms is not None and seconds*1000 > self.slow_ms:
+                self.slow_queries.append(event)
+                print('Slow query ({:.0f} ms) from {}: {}'.format(seconds*1000, caller, template[:200]))
+
+    # --------------------------------------------------------------------------------------------
+    def report(self, by='template'):
+        """
+        Return a df of successful calls, errors, time, rows and bytes per sql template
+        (by='template'), per caller outside the storage modules (by='caller') or per statement
+        site within them (by='site'), sorted by total time.
+        """
+        columns = ['calls', 'cached', 'errors', 'seconds', 'mean_ms', 'max_ms', 'rows', 'bytes']
+
+        with self._lock:
+            if by == 'template':
+                records = [dict(template=t, **{k: v for k, v in agg.items() if k != 'callers'},
+                                callers=', '.join(sorted(agg['callers'])))
+                           for t, agg in self._templates.items()]
+            else:
+                records = list(self.events)
+
+        if not records:
+            return _pd.DataFrame(columns=columns)
+
+        df = _pd.DataFrame(records)
+
+        if by != 'template':
+            df['errors'] = df['error'].notna()
+            df['seconds'] = df['seconds'].where(~df['errors'])
+            df.loc[df['errors'], ['rows', 'bytes']] = 0
+            df = df.fillna({'rows': 0, 'bytes': 0}).groupby(by).agg(
+                calls=('seconds', 'count'), cached=('cached', 'sum'), errors=('errors', 'sum'),
+                seconds=('seconds', 'sum'), max_seconds=('seconds', 'max'), rows=('rows', 'sum'),
+                bytes=('bytes', 'sum'))
+        else:
+            df = df.set_index('template')
+
+        df['mean_ms'] = (1000*df['seconds']/df['calls'].where(df['calls'] > 0)).round(3)
+        df['max_ms'] = (1000*df['max_seconds'].fillna(0)).round(3)
+
+        return df.drop(columns='max_seconds').sort_values('seconds', ascending=False)
+
+    # --------------------------------------------------------------------------------------------
+    def reset(self):
+        """ Clear the events and the per-template counters."""
+        with self._lock:
+            self.events.clear()
+            self.slow_queries.clear()
+            self._templates = {}
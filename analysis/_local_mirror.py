@@ -0,0 +1,93 @@
+import os as _os
+import json as _json
+import numpy as _np
+import pandas as _pd
+from urllib.parse import quote as _quote
+from ._utilities import _date_mask
+
+
+class LocalMirror:
+    '''
+    On-disk copy of database time series: one NPZ file (epoch-days + values) per namespace/symbol
+    and a manifest with the database version each file was downloaded at.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        _os.makedirs(path, exist_ok=True)
+
+    # --------------------------------------------------------------------------------------------
+    def _file(self, namespace, symbol):
+        return _os.path.join(self.path, namespace, _quote(symbol, safe='') + '.npz')
+
+    def _manifest_file(self, namespace):
+        return _os.path.join(self.path, namespace, 'manifest.json')
+
+    # --------------------------------------------------------------------------------------------
+    def versions(self, namespace):
+        """ Return {symbol: version} of the series stored for namespace."""
+        try:
+            with open(self._manifest_file(namespace)) as f:
+                return _json.load(f)
+
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    # --------------------------------------------------------------------------------------------
+    def stale(self, namespace, versions):
+        """ Return the symbols whose database version differs from the mirrored one."""
+        mirrored = self.versions(namespace)
+
+        return [symbol for symbol, version in versions.items()
+                if mirrored.get(symbol) != version or not _os.path.exists(self._file(namespace, symbol))]
+
+    # --------------------------------------------------------------------------------------------
+    def write(self, namespace, df, versions):
+        """
+        Store every column of a date-indexed df and record its version.
+        versions: {symbol: version} for the columns of df
+        """
+        _os.makedirs(_os.path.join(self.path, namespace), exist_ok=True)
+        manifest = self.versions(namespace)
+
+        for symbol in df.columns:
+            series = df[symbol].dropna()
+            days = _pd.DatetimeIndex(series.index).values.astype('datetime64[D]').astype('int64')
+
+            with open(self._file(namespace, symbol), 'wb') as f:
+                _np.savez(f, days=days, values=series.values.astype(float))
+
+            manifest[symbol] = versions[symbol]
+
+        # Replace the manifest atomically so readers never see a partial file
+        tmp_file = self._manifest_file(namespace) + '.tmp'
+        with open(tmp_file, 'w') as f:
+            _json.dump(manifest, f)
+        _os.replace(tmp_file, self._manifest_file(namespace))
+
+    # --------------------------------------------------------------------------------------------
+    def read(self, namespace, symbols, start=None, end=None):
+        """ Return a list of single column dfs (one per symbol) restricted to start/end."""
+        frames = []
+
+        for symbol in symbols:
+            with _np.load(self._file(namespace, symbol)) as npz:
+                index = npz['days'].astype('datetime64[D]').astype('datetime64[ns]')
+                values = npz['values']
+
+            mask = _date_mask(index, start, end)
+            frames.append(_pd.DataFrame({symbol: values[mask]},
+                                        index=_pd.DatetimeIndex(index[mask], name='Dates')))
+
+        return frames
+
+    # --------------------------------------------------------------------------------------------
+    def clear(self, namespace=None):
+        """ Remove mirrored files for a namespace (or every namespace)."""
+        namespaces = [namespace] if namespace is not None else [
+            n for n in _os.listdir(self.path) if _os.path.isdir(_os.path.join(self.path, n))]
+
+        for n in namespaces:
+            folder = _os.path.join(self.path, n)
+            for file_name in _os.listdir(folder) if _os.path.isdir(folder) else []:
+                _os.remove(_os.path.join(folder, file_name))
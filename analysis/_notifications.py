@@ -0,0 +1,102 @@
+import json as _json
+import select as _select
+import threading as _threading
+import psycopg2 as _psycopg2
+
+# Channel of the change notifications sent by HerokuDB writers
+CHANGES_CHANNEL = 'qlab_changes'
+
+# NOTIFY payloads must stay below 8000 bytes
+_MAX_PAYLOAD = 7500
+
+
+# --------------------------------------------------------------------------------------------
+def _change_payloads(namespace, symbols):
+    """ JSON payloads {'namespace', 'symbols'} for a write, symbols split to fit NOTIFY's limit."""
+    payloads, chunk = [], []
+
+    for symbol in symbols:
+        if chunk and len(_json.dumps({'namespace': namespace, 'symbols': chunk + [symbol]})) > _MAX_PAYLOAD:
+            payloads.append(_json.dumps({'namespace': namespace, 'symbols': chunk}))
+            chunk = []
+        chunk.append(symbol)
+
+    if chunk:
+        payloads.append(_json.dumps({'namespace': namespace, 'symbols': chunk}))
+
+    return payloads
+
+
+class ChangeListener:
+    '''
+    Background thread LISTENing on a channel over its own connection and calling
+    callback(namespace, symbols) for every notification. After a dropped connection it reconnects
+    and calls callback(None, None): anything may have changed meanwhile.
+    '''
+
+    def __init__(self, uri, callback, channel=CHANGES_CHANNEL, connect_kwargs=None, poll_seconds=5):
+        self.uri = uri
+        self.callback = callback
+        self.channel = channel
+        self.connect_kwargs = connect_kwargs or {}
+        self.poll_seconds = poll_seconds
+        self._conn = None
+        self._stop = _threading.Event()
+        self._thread = None
+
+    # --------------------------------------------------------------------------------------------
+    def _connect(self):
+        self._conn = _psycopg2.connect(self.uri, **self.connect_kwargs)
+        self._conn.set_session(autocommit=True)
+        self._conn.cursor().execute('LISTEN {}'.format(self.channel))
+
+    # --------------------------------------------------------------------------------------------
+    def start(self):
+        """ Connect, LISTEN and start the listener thread. Return self."""
+        self._connect()
+        self._thread = _threading.Thread(target=self._run, name='qlab-listener', daemon=True)
+        self._thread.start()
+        print('Listening for changes on', self.channel)
+
+        return self
+
+    # --------------------------------------------------------------------------------------------
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if _select.select([self._conn], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+
+                self._conn.poll()
+                while self._conn.notifies:
+                    payload = _json.loads(self._conn.notifies.pop(0).payload)
+                    self._dispatch(payload['namespace'], payload['symbols'])
+
+            except (_psycopg2.OperationalError, _psycopg2.InterfaceError) as e:
+                print(e.args)
+                if self._stop.wait(self.poll_seconds):
+                    break
+
+                try:
+                    self._connect()
+                    self._dispatch(None, None)
+                except _psycopg2.OperationalError as e:
+                    print(e.args)
+
+    def _dispatch(self, namespace, symbols):
+        try:
+            self.callback(namespace, symbols)
+        except Exception as e:
+            print(e.args)
+
+    # --------------------------------------------------------------------------------------------
+    def stop(self):
+        """ Stop the listener thread and close its connection."""
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        print('Listener stopped')
@@ -1,4 +1,3 @@
-from datetime import datetime as _datetime
 from datetime import timedelta as _timedelta
 import pandas as _pd
 
@@ -45,22 +44,50 @@ class Portfolio:
         return df
 
     # --------------------------------------------------------------------------------------------
-    def fetch_transactions(self):
+    def fetch_transactions(self, start=None, end=None, symbols=None):
+        """
+        Fetch transactions, optionally for a date range and/or a list of symbols (filtered in the
+        query; date filters need a typed transaction_date, see QlabDB.migrate_transactions_table).
+        start, end: e.g. '2020-01-01'
+        """
+        query = 'SELECT * FROM transactions'
+        conditions, data = [], []
 
-        # Fetch all transactions
-        self.db.execute_sql('SELECT * FROM transactions')
-        tr = self.db.fetch()
+        if start is not None:
+            conditions.append('transaction_date >= %s')
+            data.append(_pd.Timestamp(start).date())
 
-        # Change types
+        if end is not None:
+            conditions.append('transaction_date <= %s')
+            data.append(_pd.Timestamp(end).date())
+
+        if symbols is not None:
+            conditions.append('symbol IN ({})'.format(', '.join(['%s']*len(symbols))))
+            data += list(symbols)
+
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        tr = self.db.query(query, tuple(data) or None)
+
+        # Change types (no-ops for typed columns; legacy tables store dd/mm/YYYY strings)
         tr['id'] = tr['id'].astype(int)
         tr['transaction_price'] = tr['transaction_price'].astype(float)
-        tr['transaction_date'] = list(map(lambda x: _datetime.strptime(x, '%d/%m/%Y'), tr['transaction_date']))
+        tr['transaction_date'] = self._transaction_dates(tr['transaction_date'])
 
         # Set id
         tr = tr.set_index('id')
         
         return tr
 
+    # --------------------------------------------------------------------------------------------
+    def _transaction_dates(self, dates):
+        """ Convert date objects, ISO strings or legacy dd/mm/YYYY strings to datetime64."""
+        if len(dates) and isinstance(dates.iloc[0], str) and '/' in dates.iloc[0]:
+            return _pd.to_datetime(dates, format='%d/%m/%Y')
+
+        return _pd.to_datetime(dates)
+
     # --------------------------------------------------------------------------------------------
 
     def _fetch_transactions_and_groupings(self):
@@ -84,8 +111,8 @@ class Portfolio:
         pps = groupings['transaction_price'].mean().unstack().T
 
         # Asset prices
-        ap = self.db._read_price_time_series_data(assets_list=list(set(transactions['symbol']))
-                                    ).loc[t_0:].dropna(how='all',axis=1).ffill()
+        ap = self.db._read_price_time_series_data(assets_list=list(set(transactions['symbol'])), start=t_0
+                                    ).dropna(how='all',axis=1).ffill()
         # ap = self._fetch_asset_prices(all_transactions=transactions, start_date=t_0)
 
         # Calculate costs and value
@@ -108,8 +135,8 @@ class Portfolio:
         nos = groupings['transaction_quantity'].sum().unstack().T
 
         # Asset prices
-        ap = self.db.prices_table_read(assets_list=list(set(transactions['symbol']))
-                                    ).loc[t_0:].dropna(how='all',axis=1).ffill()
+        ap = self.db.prices_table_read(assets_list=list(set(transactions['symbol'])), start=t_0
+                                    ).dropna(how='all',axis=1).ffill()
 
         # Valuation per holding
         vph = (nos.reindex(ap.index).cumsum().ffill()).mul(ap).ffill()
@@ -0,0 +1,117 @@
+import re as _re
+import time as _time
+import threading as _threading
+from collections import OrderedDict as _OrderedDict
+
+# Tables a read depends on and tables a statement writes to
+_READ_TABLES = _re.compile(r'\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)', _re.IGNORECASE)
+_WRITE_TABLES = _re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|'
+                            r'(?:ALTER|DROP|CREATE)\s+TABLE(?:\s+IF(?:\s+NOT)?\s+EXISTS)?)\s+([A-Za-z_]\w*)',
+                            _re.IGNORECASE)
+_WRITE_STATEMENT = _re.compile(r'^\s*(?:INSERT|UPDATE|DELETE|TRUNCATE|ALTER|DROP|CREATE|COPY)\b',
+                               _re.IGNORECASE)
+
+# Reference data that rarely changes (seconds)
+_DEFAULT_TTLS = {'securities': 3600, 'market_segments': 3600, 'etfs_data': 3600,
+                 'ishares': 86400, 'exchanges': 86400, 'ft_exchanges': 86400}
+
+
+class QueryCache:
+    '''
+    Read-through cache of query results keyed on normalized sql + parameters, with per-table
+    time-to-live, a memory cap with least-recently-used eviction and invalidation by table.
+    '''
+
+    def __init__(self, ttls=None, default_ttl=0, max_bytes=256*1024**2):
+        """
+        ttls: {table: seconds}, defaults to reference tables (securities, market_segments, ...)
+        default_ttl: seconds for queries on other tables (0 disables caching them)
+        max_bytes: memory cap of the cached DataFrames
+        """
+        self.ttls = dict(_DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits, self.misses, self.evictions = 0, 0, 0
+        self._entries = _OrderedDict()
+        self._bytes = 0
+        self._lock = _threading.Lock()
+
+    # --------------------------------------------------------------------------------------------
+    def _key(self, query, data):
+        return ' '.join(query.split()), repr(data)
+
+    def _ttl(self, tables):
+        return min((self.ttls.get(t.lower(), self.default_ttl) for t in tables), default=self.default_ttl)
+
+    # --------------------------------------------------------------------------------------------
+    def get(self, query, data=None):
+        """ Return a copy of the cached result or None on a miss/expired entry."""
+        key = self._key(query, data)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry['expires'] < _time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry['df'].copy()
+
+    # --------------------------------------------------------------------------------------------
+    def put(self, query, data, df):
+        """ Cache a query result if its tables have a positive TTL and it fits in max_bytes."""
+        if df is None or _WRITE_STATEMENT.match(query):
+            return
+
+        tables = {t.lower() for t in _READ_TABLES.findall(query)}
+        ttl = self._ttl(tables)
+        size = int(df.memory_usage(deep=True).sum())
+
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        key = self._key(query, data)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = {'df': df.copy(), 'tables': tables, 'size': size,
+                                  'expires': _time.monotonic() + ttl}
+            self._bytes += size
+
+            # Evict least recently used entries
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    # --------------------------------------------------------------------------------------------
+    def invalidate_for(self, query):
+        """ Drop entries depending on the tables written by query (everything if unknown)."""
+        statements = [s for s in query.split(';') if _WRITE_STATEMENT.match(s)]
+        if not statements:
+            return
+
+        tables = {m.group(1).lower() for m in map(_WRITE_TABLES.match, statements) if m}
+
+        self.invalidate(tables if len(tables) == len(statements) else None)
+
+    def invalidate(self, tables=None):
+        """ Drop entries reading any of tables (every entry if tables is None)."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if tables is None or e['tables'] & set(tables)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)['size']
+
+    # --------------------------------------------------------------------------------------------
+    def stats(self):
+        """ Return hits, misses, evictions, entries and cached bytes."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._entries), 'bytes': self._bytes}
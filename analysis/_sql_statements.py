@@ -15,13 +15,54 @@ sql_ishares_table_create = """
 sql_prices_table_create = """
                           CREATE TABLE IF NOT EXISTS prices (
                               symbol text NOT NULL PRIMARY KEY,
-                              data text NOT NULL)
+                              data text,
+                              data_bin bytea)
+                           """
+
+sql_prices_daily_table_create = """
+                          CREATE TABLE IF NOT EXISTS prices_daily (
+                              symbol text NOT NULL,
+                              date date NOT NULL,
+                              price double precision NOT NULL,
+                              PRIMARY KEY (symbol, date))
                            """
 
 sql_rates_table_create = """
                           CREATE TABLE IF NOT EXISTS rates (
                               symbol text NOT NULL PRIMARY KEY,
-                              data text NOT NULL)
+                              data text,
+                              data_bin bytea)
+                           """
+
+# Series of any other namespace (e.g. volumes, derived metrics), same blob columns as prices/rates
+sql_series_table_create = """
+                          CREATE TABLE IF NOT EXISTS series (
+                              namespace text NOT NULL,
+                              symbol text NOT NULL,
+                              data text,
+                              data_bin bytea,
+                              PRIMARY KEY (namespace, symbol))
+                           """
+
+# Delta sync windows that DeGiro returned no data for (suspensions, late listings), not requested again
+sql_sync_empty_windows_table_create = """
+                          CREATE TABLE IF NOT EXISTS sync_empty_windows (
+                              namespace text NOT NULL,
+                              symbol text NOT NULL,
+                              window_start date NOT NULL,
+                              window_end date NOT NULL,
+                              checked_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                              PRIMARY KEY (namespace, symbol, window_start, window_end))
+                           """
+
+sql_series_meta_table_create = """
+                          CREATE TABLE IF NOT EXISTS series_meta (
+                              namespace text NOT NULL,
+                              symbol text NOT NULL,
+                              version bigint NOT NULL DEFAULT 1,
+                              updated_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                              content_hash text,
+                              PRIMARY KEY (namespace, symbol))
                            """
 
 sql_transactions_table_create = """
@@ -31,7 +72,9 @@ sql_transactions_table_create = """
                                    transaction_price numeric NOT NULL,
                                    transaction_quantity integer NOT NULL,
                                    transaction_type varchar NOT NULL,
-                                   transaction_date varchar NOT NULL)
+                                   transaction_date date NOT NULL);
+                                CREATE INDEX IF NOT EXISTS transactions_date_idx ON transactions (transaction_date);
+                                CREATE INDEX IF NOT EXISTS transactions_symbol_date_idx ON transactions (symbol, transaction_date);
                                 """
 
 sql_securities_table_create = """
@@ -71,27 +114,74 @@ sql_etfs_data_table_create = """
                          CREATE TABLE IF NOT EXISTS etfs_data (
                               ft_symbol varchar NOT NULL PRIMARY KEY,
                               isin varchar,
-                              aum varchar,
-                              exp_ratio varchar,
+                              aum double precision,
+                              aum_currency varchar,
+                              exp_ratio double precision,
                               ft_currency varchar,
                               domicile varchar,
                               launch_date varchar,
-                              sec_technology varchar,
-                              sec_financials varchar,
-                              sec_healthcare varchar,
-                              sec_cyclicals varchar,
-                              sec_industrials varchar,
-                              sec_communications varchar,
-                              sec_defensives varchar,
-                              sec_materials varchar,
-                              sec_energy varchar,
-                              non_equities varchar,
-                              sec_other varchar,
-                              bottom_90 varchar,
-                              top_10 varchar)
+                              sec_technology double precision,
+                              sec_financials double precision,
+                              sec_healthcare double precision,
+                              sec_cyclicals double precision,
+                              sec_industrials double precision,
+                              sec_communications double precision,
+                              sec_defensives double precision,
+                              sec_materials double precision,
+                              sec_energy double precision,
+                              non_equities double precision,
+                              sec_other double precision,
+                              bottom_90 double precision,
+                              top_10 double precision)
                          """
 
 
+# ------------------------------------------------------------------------------------------
+# ALTER TABLES
+# Binary codec column for tables created before data_bin existed (legacy rows keep data)
+sql_prices_table_add_data_bin = """
+                          ALTER TABLE prices ADD COLUMN IF NOT EXISTS data_bin bytea;
+                          ALTER TABLE prices ALTER COLUMN data DROP NOT NULL;
+                          """
+
+sql_rates_table_add_data_bin = """
+                          ALTER TABLE rates ADD COLUMN IF NOT EXISTS data_bin bytea;
+                          ALTER TABLE rates ALTER COLUMN data DROP NOT NULL;
+                          """
+
+# SQLite has neither ADD COLUMN IF NOT EXISTS nor DROP NOT NULL; its tables were always created
+# with data_bin and a nullable data column, so only make sure they exist
+sql_prices_table_add_data_bin_sqlite = sql_prices_table_create
+
+sql_rates_table_add_data_bin_sqlite = sql_rates_table_create
+
+# Typed transaction dates for tables created with varchar dd/mm/YYYY dates (no-op once migrated)
+sql_transactions_table_migrate_date = """
+                          DO $$
+                          BEGIN
+                              IF (SELECT data_type FROM information_schema.columns
+                                  WHERE table_name = 'transactions' AND column_name = 'transaction_date') <> 'date' THEN
+                                  ALTER TABLE transactions ALTER COLUMN transaction_date TYPE date
+                                      USING to_date(transaction_date, 'DD/MM/YYYY');
+                              END IF;
+                          END $$;
+                          CREATE INDEX IF NOT EXISTS transactions_date_idx ON transactions (transaction_date);
+                          CREATE INDEX IF NOT EXISTS transactions_symbol_date_idx ON transactions (symbol, transaction_date);
+                          """
+
+sql_transactions_table_migrate_date_sqlite = """
+                          UPDATE transactions
+                          SET transaction_date = substr(transaction_date, 7, 4) || '-' ||
+                                                 substr(transaction_date, 4, 2) || '-' ||
+                                                 substr(transaction_date, 1, 2)
+                          WHERE transaction_date LIKE '__/__/____';
+                          CREATE INDEX IF NOT EXISTS transactions_date_idx ON transactions (transaction_date);
+                          CREATE INDEX IF NOT EXISTS transactions_symbol_date_idx ON transactions (symbol, transaction_date);
+                          """
+
+# Hash of the stored series content for series_meta tables created before content_hash existed
+sql_series_meta_add_content_hash = """ALTER TABLE series_meta ADD COLUMN content_hash text"""
+
 # ------------------------------------------------------------------------------------------
 # DROP TABLES
 sql_market_segments_table_drop = """DROP TABLE IF EXISTS market_segments"""
@@ -100,8 +190,16 @@ sql_ishares_table_drop = """DROP TABLE IF EXISTS ishares"""
 
 sql_prices_table_drop = """DROP TABLE IF EXISTS prices"""
 
+sql_prices_daily_table_drop = """DROP TABLE IF EXISTS prices_daily"""
+
 sql_rates_table_drop = """DROP TABLE IF EXISTS rates"""
 
+sql_series_table_drop = """DROP TABLE IF EXISTS series"""
+
+sql_series_meta_table_drop = """DROP TABLE IF EXISTS series_meta"""
+
+sql_sync_empty_windows_table_drop = """DROP TABLE IF EXISTS sync_empty_windows"""
+
 sql_transactions_table_drop = """DROP TABLE IF EXISTS transactions"""
 
 sql_securities_table_drop = """DROP TABLE IF EXISTS securities"""
@@ -143,6 +241,17 @@ sql_prices_insert_query = """
                                  DO UPDATE SET data = EXCLUDED.data
                         """
 
+# Multi-row form: VALUES %s is expanded by psycopg2.extras.execute_values
+sql_prices_daily_insert_query = """
+                        INSERT INTO prices_daily (
+                             symbol,
+                             date,
+                             price)
+                             VALUES %s
+                             ON CONFLICT (symbol, date)
+                                 DO UPDATE SET price = EXCLUDED.price
+                        """
+
 sql_rates_insert_query = """
                         INSERT INTO rates (
                              symbol,
@@ -152,6 +261,97 @@ sql_rates_insert_query = """
                                  DO UPDATE SET data = EXCLUDED.data
                         """
 
+sql_prices_bin_insert_query = """
+                        INSERT INTO prices (
+                             symbol,
+                             data_bin)
+                             VALUES (%s, %s)
+                             ON CONFLICT (symbol)
+                                 DO UPDATE SET data = NULL,
+                                               data_bin = EXCLUDED.data_bin
+                        """
+
+sql_rates_bin_insert_query = """
+                        INSERT INTO rates (
+                             symbol,
+                             data_bin)
+                             VALUES (%s, %s)
+                             ON CONFLICT (symbol)
+                                 DO UPDATE SET data = NULL,
+                                               data_bin = EXCLUDED.data_bin
+                        """
+
+sql_series_insert_query = """
+                        INSERT INTO series (
+                             namespace,
+                             symbol,
+                             data)
+                             VALUES (%s, %s, %s)
+                             ON CONFLICT (namespace, symbol)
+                                 DO UPDATE SET data = EXCLUDED.data
+                        """
+
+sql_series_bin_insert_query = """
+                        INSERT INTO series (
+                             namespace,
+                             symbol,
+                             data_bin)
+                             VALUES (%s, %s, %s)
+                             ON CONFLICT (namespace, symbol)
+                                 DO UPDATE SET data = NULL,
+                                               data_bin = EXCLUDED.data_bin
+                        """
+
+# Multi-row form: VALUES %s of (namespace, symbol, content_hash), bumps the version of every
+# written series
+sql_series_meta_bump_query = """
+                        INSERT INTO series_meta (
+                             namespace,
+                             symbol,
+                             content_hash)
+                             VALUES %s
+                             ON CONFLICT (namespace, symbol)
+                                 DO UPDATE SET version = series_meta.version + 1,
+                                               updated_at = CURRENT_TIMESTAMP,
+                                               content_hash = EXCLUDED.content_hash
+                        """
+
+# Multi-row form: VALUES %s of (namespace, symbol, window_start, window_end)
+sql_sync_empty_windows_insert_query = """
+                        INSERT INTO sync_empty_windows (
+                             namespace,
+                             symbol,
+                             window_start,
+                             window_end)
+                             VALUES %s
+                             ON CONFLICT (namespace, symbol, window_start, window_end) DO NOTHING
+                        """
+
+# Version 1 for series written before series_meta existed (WHERE true keeps SQLite's upsert parser happy)
+sql_series_meta_backfill_prices = """
+                        INSERT INTO series_meta (namespace, symbol)
+                             SELECT 'prices', symbol FROM prices WHERE true
+                             ON CONFLICT (namespace, symbol) DO NOTHING
+                        """
+
+sql_series_meta_backfill_prices_daily = """
+                        INSERT INTO series_meta (namespace, symbol)
+                             SELECT DISTINCT 'prices', symbol FROM prices_daily WHERE true
+                             ON CONFLICT (namespace, symbol) DO NOTHING
+                        """
+
+sql_series_meta_backfill_rates = """
+                        INSERT INTO series_meta (namespace, symbol)
+                             SELECT 'rates', symbol FROM rates WHERE true
+                             ON CONFLICT (namespace, symbol) DO NOTHING
+                        """
+
+sql_series_meta_backfill_series = """
+                        INSERT INTO series_meta (namespace, symbol)
+                             SELECT namespace, symbol FROM series WHERE true
+                             ON CONFLICT (namespace, symbol) DO NOTHING
+                        """
+
 sql_transactions_insert_query = """
                         INSERT INTO transactions (
                                  id,
@@ -165,7 +365,7 @@ sql_transactions_insert_query = """
                                      DO UPDATE SET symbol = EXCLUDED.symbol,
                                                    transaction_price = EXCLUDED.transaction_price,
                                                    transaction_quantity = EXCLUDED.transaction_quantity,
-                                                   transaction_type = EXCLUDED.transaction_quantity,
+                                                   transaction_type = EXCLUDED.transaction_type,
                                                    transaction_date = EXCLUDED.transaction_date
                         """
 
@@ -220,6 +420,7 @@ sql_etfs_data_insert_query = """
                               ft_symbol,
                               isin,
                               aum,
+                              aum_currency,
                               exp_ratio,
                               ft_currency,
                               domicile,
@@ -237,10 +438,11 @@ sql_etfs_data_insert_query = """
                               sec_other,
                               bottom_90,
                               top_10)
-                             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                              ON CONFLICT (ft_symbol)
                                  DO UPDATE SET isin = EXCLUDED.isin,
                                                aum = EXCLUDED.aum,
+                                               aum_currency = EXCLUDED.aum_currency,
                                                exp_ratio = EXCLUDED.exp_ratio,
                                                ft_currency = EXCLUDED.ft_currency,
                                                domicile = EXCLUDED.domicile,
@@ -274,6 +476,10 @@ sql_prices_delete_query = """
                            DELETE FROM prices WHERE symbol = %s
                            """
 
+sql_prices_daily_delete_query = """
+                           DELETE FROM prices_daily WHERE symbol = %s
+                           """
+
 sql_rates_delete_query = """
                            DELETE FROM rates WHERE symbol = %s
                            """
@@ -298,6 +504,86 @@ sql_etf_data_delete_query = """
                         DELETE FROM etfs_data WHERE ft_symbol = %s
                         """
 # ------------------------------------------------------------------------------------------
+# CATALOG
+sql_list_tables_query = """
+        SELECT table_name
+        FROM information_schema.tables
+        WHERE table_schema = 'public'
+        """
+
+sql_list_tables_query_sqlite = """
+        SELECT name AS table_name
+        FROM sqlite_master
+        WHERE type = 'table'
+        """
+
+# Rows (exact counts via query_to_xml when the parameter is true, planner estimates otherwise),
+# sizes and write/maintenance statistics of every table in one round-trip
+sql_table_statistics_query = """
+        SELECT c.relname AS table_name,
+               CASE WHEN %s
+                    THEN (xpath('/row/count/text()',
+                                query_to_xml(format('SELECT COUNT(*) FROM %%I.%%I', n.nspname, c.relname),
+                                             false, true, '')))[1]::text::bigint
+                    WHEN c.reltuples >= 0 THEN c.reltuples::bigint
+               END AS row_count,
+               pg_table_size(c.oid) AS table_bytes,
+               pg_indexes_size(c.oid) AS index_bytes,
+               pg_total_relation_size(c.oid) AS total_bytes,
+               s.n_tup_ins AS inserts,
+               s.n_tup_upd AS updates,
+               s.n_tup_del AS deletes,
+               s.n_dead_tup AS dead_rows,
+               GREATEST(s.last_analyze, s.last_autoanalyze) AS last_analyze,
+               GREATEST(s.last_vacuum, s.last_autovacuum) AS last_vacuum
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE c.relkind = 'r' AND n.nspname = 'public'
+        ORDER BY total_bytes DESC
+        """
+
+# Table and index sizes, available when SQLite is compiled with the dbstat virtual table
+sql_table_sizes_query_sqlite = """
+        SELECT m.tbl_name AS table_name,
+               SUM(CASE WHEN m.type = 'table' THEN d.pgsize ELSE 0 END) AS table_bytes,
+               SUM(CASE WHEN m.type = 'index' THEN d.pgsize ELSE 0 END) AS index_bytes
+        FROM dbstat d
+        JOIN sqlite_master m ON m.name = d.name
+        GROUP BY m.tbl_name
+        """
+
+# ------------------------------------------------------------------------------------------
+# FINGERPRINTS
+# Changes whenever a transaction or the price version of a held symbol changes
+sql_portfolio_fingerprint_query = """
+        SELECT (SELECT COUNT(*) FROM transactions) AS n_transactions,
+               (SELECT MAX(id) FROM transactions) AS max_id,
+               (SELECT md5(string_agg(t::text, ',' ORDER BY t.id)) FROM transactions t) AS checksum,
+               (SELECT md5(string_agg(m.symbol || ':' || m.version, ',' ORDER BY m.symbol))
+                FROM series_meta m
+                WHERE m.namespace = 'prices'
+                AND m.symbol IN (SELECT symbol FROM transactions)) AS prices_version
+        """
+
+# Same fingerprint for SQLite (md5 is registered by SQLiteDB, group_concat over ordered rows)
+sql_portfolio_fingerprint_query_sqlite = """
+        SELECT (SELECT COUNT(*) FROM transactions) AS n_transactions,
+               (SELECT MAX(id) FROM transactions) AS max_id,
+               (SELECT md5(group_concat(row, ',')) FROM (
+                    SELECT id || '|' || symbol || '|' || transaction_price || '|' ||
+                           transaction_quantity || '|' || transaction_type || '|' ||
+                           transaction_date AS row
+                    FROM transactions ORDER BY id)) AS checksum,
+               (SELECT md5(group_concat(row, ',')) FROM (
+                    SELECT symbol || ':' || version AS row
+                    FROM series_meta
+                    WHERE namespace = 'prices'
+                    AND symbol IN (SELECT symbol FROM transactions)
+                    ORDER BY symbol)) AS prices_version
+        """
+
+# ------------------------------------------------------------------------------------------
 # JOINS
 sql_join_3 = """
         SELECT securities.exchange_id, isin, currency, symbol, product_type, ft_exchanges.exchange_code, ft_exch_code
@@ -0,0 +1,224 @@
+import sqlite3 as _sqlite3
+import threading as _threading
+import hashlib as _hashlib
+import time as _time
+import re as _re
+import datetime as _dt
+import numpy as _np
+from contextlib import contextmanager as _contextmanager
+import pandas as _pd
+from ._storage import QlabDB
+from ._sql_statements import sql_list_tables_query_sqlite, sql_portfolio_fingerprint_query_sqlite, \
+    sql_transactions_table_migrate_date_sqlite, sql_table_sizes_query_sqlite, \
+    sql_prices_table_add_data_bin_sqlite, sql_rates_table_add_data_bin_sqlite
+
+# Store dates as ISO text and numpy scalars as plain numbers
+_sqlite3.register_adapter(_dt.date, lambda d: d.isoformat())
+_sqlite3.register_adapter(_dt.datetime, lambda d: d.isoformat(sep=' '))
+_sqlite3.register_adapter(_np.int64, int)
+_sqlite3.register_adapter(_np.float64, float)
+
+# --------------------------------------------------------------------------------------------
+def _to_sqlite(query, n_columns=None):
+    """
+    Translate a psycopg2 statement from _sql_statements to SQLite: %s placeholders become ? and
+    a multi-row 'VALUES %s' placeholder becomes a single-row template of n_columns.
+    """
+    if n_columns is not None:
+        query = _re.sub(r'VALUES\s+%s', 'VALUES (' + ', '.join(['?']*n_columns) + ')', query)
+
+    return query.replace('%s', '?')
+
+
+class SQLiteDB(QlabDB):
+
+    _list_tables_query = sql_list_tables_query_sqlite
+    _portfolio_fingerprint_query = sql_portfolio_fingerprint_query_sqlite
+    _transactions_migrate_query = sql_transactions_table_migrate_date_sqlite
+    _add_data_bin_queries = (sql_prices_table_add_data_bin_sqlite, sql_rates_table_add_data_bin_sqlite)
+
+    def __init__(self, path, prices_layout='blob', blob_codec='json', mirror_dir=None, query_cache=None,
+                 slow_query_ms=None):
+        """
+        Embedded, file-backed backend with the same tables as HerokuDB (path=':memory:' for a
+        throwaway database). See QlabDB for prices_layout, blob_codec, mirror_dir,
+        query_cache and slow_query_ms.
+        """
+        super().__init__(prices_layout=prices_layout, blob_codec=blob_codec, mirror_dir=mirror_dir,
+                         query_cache=query_cache, slow_query_ms=slow_query_ms)
+        self.path = path
+        self._conn = None
+        self._lock = _threading.RLock()
+
+    # --------------------------------------------------------------------------------------------
+    def connect(self):
+        '''
+        Open the database file. Statements run in autocommit mode, like HerokuDB.
+        '''
+        try:
+            self._conn = _sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.create_function('md5', 1,
+                                       lambda x: None if x is None else _hashlib.md5(str(x).encode()).hexdigest())
+            print('Connected to DB')
+
+        except Exception as e:
+            print(e.args)
+
+    # --------------------------------------------------------------------------------------------
+    def close(self):
+        '''
+        Close the database file.
+        '''
+        try:
+            if self._conn != None:
+                self._conn.close()
+                self._conn = None
+                print('Connection closed')
+            else:
+                print('No connection is available')
+
+        except Exception as e:
+            print(e.args)
+
+    # --------------------------------------------------------------------------------------------
+    @_contextmanager
+    def _checkout(self):
+        '''
+        Yield the connection for exclusive use (held under a lock).
+        '''
+        if self._conn is None:
+            raise ConnectionError('Connection is not available')
+
+        with self._lock:
+            yield self._conn
+
+    # --------------------------------------------------------------------------------------------
+    def _query(self, query, data=None, index_name=None):
+        '''
+        Execute an sql query and return its rows as a DataFrame (None if the query returns no
+        rows, e.g. an insert).
+        '''
+        with self._checkout() as conn:
+            cur = conn.execute(_to_sqlite(query), data or ())
+
+            if cur.description is None:
+                return None
+
+            return self._records_to_df(cur.fetchall(), cur.description, index_name)
+
+    # --------------------------------------------------------------------------------------------
+    def _execute_sql(self, query, data=None):
+        '''
+        Execute an sql query. Data must be a tuple, e.g. (value,) or (value_1, value_2).
+        Several ;-separated statements (e.g. a table and its indexes) run as a script. The rows
+        are kept per thread for a subsequent fetch().
+        '''
+        self._local.result = None
+
+        with self._checkout() as conn:
+            if data is None and _re.search(r';\s*\S', query):
+                conn.executescript(query)
+            else:
+                cur = conn.execute(_to_sqlite(query), data or ())
+                self._local.result = (cur.fetchall(), cur.description) if cur.description else None
+
+    # --------------------------------------------------------------------------------------------
+    def _execute_values(self, query, rows, page_size=1000):
+        '''
+        Execute a multi-row sql query. Query must contain a single VALUES %s placeholder and rows
+        must be a list of tuples.
+        '''
+        if rows:
+            with self._checkout() as conn:
+                conn.executemany(_to_sqlite(query, n_columns=len(rows[0])), rows)
+
+    # --------------------------------------------------------------------------------------------
+    def _bulk_write(self, query, rows, page_size=1000):
+        '''
+        Write rows in a single transaction, rolled back on failure.
+        query: single-row statement, e.g. sql_exchange_insert_query, or a VALUES %s statement
+        rows: list of tuples
+        Return a summary dict with rows written, pages and seconds.
+        '''
+        summary = {'rows': len(rows), 'pages': -(-len(rows)//page_size), 'seconds': 0.0}
+        started = _time.perf_counter()
+
+        try:
+            if rows:
+                with self._checkout() as conn:
+                    conn.execute('BEGIN')
+                    try:
+                        conn.executemany(_to_sqlite(query, n_columns=len(rows[0])), rows)
+                        conn.execute('COMMIT')
+
+                    except Exception:
+                        conn.execute('ROLLBACK')
+                        raise
+
+        except Exception as e:
+            summary['rows'], summary['error'] = 0, e.args
+            print(e.args)
+
+        summary['seconds'] = round(_time.perf_counter() - started, 3)
+
+        return summary
+
+    # --------------------------------------------------------------------------------------------
+    def fetch_chunks(self, query, data=None, chunksize=50000):
+        """
+        Yield the rows of a query as DataFrames of at most chunksize rows (one empty DataFrame with
+        the query's columns if it returns no rows). The connection is held until the generator is
+        exhausted or closed.
+        """
+        with self._checkout() as conn:
+            cur = conn.execute(_to_sqlite(query), data or ())
+
+            try:
+                empty = True
+
+                while True:
+                    records = cur.fetchmany(chunksize)
+                    if not records:
+                        break
+
+                    empty = False
+                    yield _pd.DataFrame(records, columns=[elt[0] for elt in cur.description])
+
+                if empty:
+                    yield _pd.DataFrame(columns=[elt[0] for elt in cur.description])
+
+            finally:
+                cur.close()
+
+    # --------------------------------------------------------------------------------------------
+    def table_statistics(self, exact=False):
+        """
+        Same columns as QlabDB.table_statistics. SQLite keeps no estimates or write counters, so rows
+        are always counted (one UNION ALL query) and sizes come from dbstat when it is compiled in.
+        """
+        try:
+            tables = list(self.query(query=self._list_tables_query)['table_name'])
+            stats = _pd.DataFrame(index=_pd.Index(tables, name='table_name'),
+                                  columns=['row_count', 'table_bytes', 'index_bytes', 'total_bytes', 'inserts',
+                                           'updates', 'deletes', 'dead_rows', 'last_analyze', 'last_vacuum'])
+            if not tables:
+                return stats
+
+            counts = self.query(' UNION ALL '.join("SELECT '{0}' AS table_name, COUNT(*) AS row_count FROM \"{0}\"".format(t)
+                                                   for t in tables), index_name='table_name')
+            stats['row_count'] = counts['row_count']
+
+            with self._checkout() as conn:
+                try:
+                    sizes = _pd.DataFrame(conn.execute(sql_table_sizes_query_sqlite).fetchall(),
+                                          columns=['table_name', 'table_bytes', 'index_bytes']).set_index('table_name')
+                    stats['table_bytes'], stats['index_bytes'] = sizes['table_bytes'], sizes['index_bytes']
+                    stats['total_bytes'] = stats['table_bytes'] + stats['index_bytes']
+
+                except _sqlite3.OperationalError:
+                    pass
+
+            return stats
+
+        except Exception as e:
+            print(e.args)
@@ -0,0 +1,805 @@
+import abc as _abc
+import itertools as _itertools
+import threading as _threading
+import time as _time
+import numpy as _np
+import pandas as _pd
+from ._ft_market_data import ft_aggregate, ft_summary, ft_sectors, ft_securities, _parse_number, _parse_aum
+from ._sql_statements import *
+from ._utilities import _assemble_panel
+from ._portfolio import Portfolio
+from ._local_mirror import LocalMirror
+from ._query_cache import QueryCache
+from ._instrumentation import QueryStats, _payload_bytes
+from ._yields_data import update_govt_yields
+from ._http import http_client as _http
+from ._timeseries_store import TimeSeriesStore
+
+# <<etfs_data>> columns of the ft_aggregate rows
+_ETFS_DATA_COLUMNS = {'ISIN': 'isin', 'AUM': 'aum', 'ExpRatio': 'exp_ratio', 'Currency': 'ft_currency',
+                      'Domicile': 'domicile', 'Launch': 'launch_date', 'Technology': 'sec_technology',
+                      'Financial Services': 'sec_financials', 'Healthcare': 'sec_healthcare',
+                      'Consumer Cyclical': 'sec_cyclicals', 'Industrials': 'sec_industrials',
+                      'Communication Services': 'sec_communications', 'Consumer Defensive': 'sec_defensives',
+                      'Basic Materials': 'sec_materials', 'Energy': 'sec_energy', 'Non-equities': 'non_equities',
+                      'UnidentifiedSectors': 'sec_other', 'UnidentifiedSecurities': 'bottom_90', 'Top-10': 'top_10'}
+
+_ETFS_DATA_NUMERIC = ['exp_ratio', 'sec_technology', 'sec_financials', 'sec_healthcare', 'sec_cyclicals',
+                      'sec_industrials', 'sec_communications', 'sec_defensives', 'sec_materials', 'sec_energy',
+                      'non_equities', 'sec_other', 'bottom_90', 'top_10']
+
+# Column order of sql_etfs_data_insert_query after ft_symbol
+_ETFS_DATA_INSERT_ORDER = ['isin', 'aum', 'aum_currency'] + list(_ETFS_DATA_COLUMNS.values())[2:]
+
+
+class QlabDB(_abc.ABC):
+    '''
+    Storage interface shared by the database backends (HerokuDB for PostgreSQL, SQLiteDB for an
+    embedded file). Backends implement the connection primitives (connect, close, _query,
+    _execute_sql, _execute_values, _bulk_write, _fetch, fetch_chunks), which raise on failure;
+    the public wrappers here print and record errors. Every loader and reader is written once
+    here against the schema in _sql_statements.
+    '''
+
+    # Backend specific statements
+    _list_tables_query = sql_list_tables_query
+    _portfolio_fingerprint_query = sql_portfolio_fingerprint_query
+    _transactions_migrate_query = sql_transactions_table_migrate_date
+    _add_data_bin_queries = (sql_prices_table_add_data_bin, sql_rates_table_add_data_bin)
+
+    def __init__(self, prices_layout='blob', blob_codec='json', mirror_dir=None, query_cache=None,
+                 slow_query_ms=None):
+        """
+        prices_layout: 'blob' keeps one JSON row per symbol in <<prices>>, 'normalized' uses one row
+        per symbol/date in <<prices_daily>> (see migrate_prices_table)
+        blob_codec: 'json' | 'binary', encoding used when writing prices/rates blobs (reads detect
+        either, see migrate_blob_codec)
+        mirror_dir: optional directory for a local copy of prices/rates, re-downloaded per symbol
+        only when its version in <<series_meta>> changes (see series_meta_backfill)
+        query_cache: optional QueryCache (or True for the default one) serving repeated query()
+        calls from memory; writes through this instance invalidate the tables they touch
+        slow_query_ms: print statements slower than this (every statement is timed in query_stats,
+        see query_report)
+        """
+        self.url = 'https://trader.degiro.nl/product_search/config/dictionary'
+        self.prices_layout = prices_layout
+        self.blob_codec = blob_codec
+        self.mirror = LocalMirror(mirror_dir) if mirror_dir is not None else None
+        self._cursor_ids = _itertools.count()
+        self._port_cache = (None, None)
+        self.query_cache = QueryCache() if query_cache is True else query_cache or None
+        self.query_stats = QueryStats(slow_ms=slow_query_ms)
+        self._last_statement = _threading.local()
+        # Rows of each thread's last execute_sql, set by the backend's _execute_sql
+        self._local = _threading.local()
+
+    # --------------------------------------------------------------------------------------------
+    @_abc.abstractmethod
+    def connect(self):
+        """Open the connection(s) to the database."""
+
+    @_abc.abstractmethod
+    def close(self):
+        """Close the connection(s) to the database."""
+
+    @_abc.abstractmethod
+    def _query(self, query, data=None, index_name=None):
+        """Execute an sql query and return its rows as a DataFrame (None if it returns no rows)."""
+
+    @_abc.abstractmethod
+    def _execute_sql(self, query, data=None):
+        """Execute an sql query, rows are then available through fetch()."""
+
+    @_abc.abstractmethod
+    def _execute_values(self, query, rows, page_size=1000):
+        """Execute a multi-row sql query (a single VALUES %s placeholder) for a list of tuples."""
+
+    @_abc.abstractmethod
+    def _bulk_write(self, query, rows, page_size=1000):
+        """Write rows in a single transaction and return a rows/pages/seconds summary."""
+
+    @_abc.abstractmethod
+    def fetch_chunks(self, query, data=None, chunksize=50000):
+        """
+        Yield the rows of a query as DataFrames of at most chunksize rows (one empty DataFrame with
+        the query's columns if it returns no rows).
+        """
+
+    # --------------------------------------------------------------------------------------------
+    def _fetch(self, limit=None):
+        """Rows and description of this thread's last execute_sql (None if it returned no rows), at most limit rows."""
+        result = getattr(self._local, 'result', None)
+        if result is None:
+            return None
+
+        records, description = result
+
+        return (records if limit is None else records[:limit]), description
+
+    # --------------------------------------------------------------------------------------------
+    def query(self, query, data=None, index_name=None):
+        '''
+        Execute an sql query and return its rows as a DataFrame (None if the query returns no
+        rows, e.g. an insert). Served from query_cache when one is set.
+        '''
+        started = _time.perf_counter()
+        cache = self.query_cache
+        df = None if cache is None else cache.get(query, (data, index_name))
+        cached = df is not None
+
+        error = None
+
+        if not cached:
+            if cache is not None:
+                cache.invalidate_for(query)
+
+            try:
+                df = self._query(query, data=data, index_name=index_name)
+
+                if cache is not None:
+                    cache.put(query, (data, index_name), df)
+
+            except Exception as e:
+                error = e.args
+                print(e.args)
+
+        self.query_stats.record('query', query, _time.perf_counter() - started,
+                                rows=None if df is None else len(df.index),
+                                nbytes=None if df is None else int(df.memory_usage(deep=True).sum()),
+                                cached=cached, error=error)
+
+        return df
+
+    # --------------------------------------------------------------------------------------------
+    def execute_sql(self, query, data=None):
+        '''
+        Execute an sql query. Data must be a tuple, e.g. (value,) or (value_1, value_2).
+        Return True if it succeeded; its rows are then available through fetch().
+        '''
+        started = _time.perf_counter()
+        if self.query_cache is not None:
+            self.query_cache.invalidate_for(query)
+
+        self._last_statement.query = query
+        error = None
+
+        try:
+            self._execute_sql(query, data=data)
+            print('Query executed', end = "\r")
+
+        except Exception as e:
+            error = e.args
+            print(e.args)
+
+        self.query_stats.record('execute_sql', query, _time.perf_counter() - started, error=error)
+
+        return error is None
+
+    # --------------------------------------------------------------------------------------------
+    def execute_values(self, query, rows, page_size=1000):
+        '''
+        Execute a multi-row sql query. Query must contain a single VALUES %s placeholder and rows
+        must be a list of tuples. Return True if it succeeded.
+        '''
+        started = _time.perf_counter()
+        if self.query_cache is not None:
+            self.query_cache.invalidate_for(query)
+
+        error = None
+
+        try:
+            self._execute_values(query, rows, page_size=page_size)
+            print('Query executed', end = "\r")
+
+        except Exception as e:
+            error = e.args
+            print(e.args)
+
+        self.query_stats.record('execute_values', query, _time.perf_counter() - started,
+                                rows=len(rows), nbytes=_payload_bytes(rows), error=error)
+
+        return error is None
+
+    # --------------------------------------------------------------------------------------------
+    def bulk_write(self, query, rows, page_size=1000):
+        '''
+        Write rows in a single transaction, rolled back on failure.
+        Return a summary dict with rows written, pages and seconds.
+        '''
+        started = _time.perf_counter()
+        if self.query_cache is not None:
+            self.query_cache.invalidate_for(query)
+
+        summary = self._bulk_write(query, rows, page_size=page_size)
+        self.query_stats.record('bulk_write', query, _time.perf_counter() - started,
+                                rows=summary['rows'], nbytes=_payload_bytes(rows), error=summary.get('error'))
+
+        return summary
+
+    # --------------------------------------------------------------------------------------------
+    def fetch(self, index_name=None, limit=None):
+        """
+        Fetch the rows of this thread's last execute_sql as a DataFrame (None if it returned no
+        rows). Pass limit to fetch at most that many rows.
+        """
+        started = _time.perf_counter()
+        df, error = None, None
+
+        try:
+            result = self._fetch(limit=limit)
+            if result is not None:
+                df = self._records_to_df(*result, index_name=index_name)
+
+        except Exception as e:
+            error = e.args
+            print(e.args)
+
+        self.query_stats.record('fetch', getattr(self._last_statement, 'query', ''), _time.perf_counter() - started,
+                                rows=None if df is None else len(df.index),
+                                nbytes=None if df is None else int(df.memory_usage(deep=True).sum()),
+                                error=error)
+
+        return df
+
+    # --------------------------------------------------------------------------------------------
+    def query_report(self, by='template'):
+        """
+        Return calls, total/mean/max time, rows and bytes of the statements issued so far, per sql
+        template (by='template', with the caller sites) or per caller site (by='caller').
+        """
+        return self.query_stats.report(by=by)
+
+    # --------------------------------------------------------------------------------------------
+    def clean_degiro_search(self, search_results):
+        """
+        Return a cleaned dictionary.
+        """
+        if 'vwdIdSecondary' not in search_results:
+            search_results['vwdIdSecondary'] = -1
+
+        if 'vwdId' not in search_results:
+            search_results['vwdId'] = -1
+
+
+        clean_data = (search_results['id'],search_results['name'],search_results['isin'],\
+                      search_results['vwdId'],search_results['symbol'],search_results['productType'],\
+                      search_results['productTypeId'],search_results['currency'],\
+                      search_results['exchangeId'],search_results['vwdIdSecondary'])
+
+        return clean_data
+    
+    # --------------------------------------------------------------------------------------------
+    def fetch_all(self, query, data=None, chunksize=50000, index_name=None):
+        """Stream a query with fetch_chunks and concatenate the chunks once at the end."""
+        started = _time.perf_counter()
+
+        try:
+            chunks = list(self.fetch_chunks(query, data=data, chunksize=chunksize))
+
+        except Exception as e:
+            self.query_stats.record('fetch_chunks', query, _time.perf_counter() - started, error=e.args)
+            print(e.args)
+            return None
+
+        self.query_stats.record('fetch_chunks', query, _time.perf_counter() - started,
+                                rows=sum(len(c.index) for c in chunks),
+                                nbytes=sum(int(c.memory_usage(deep=True).sum()) for c in chunks))
+
+        df = _pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+        return df if index_name is None else df.set_index(index_name)
+
+    # --------------------------------------------------------------------------------------------
+    def _records_to_df(self, records, description, index_name=None):
+        """ Build the DataFrame returned by fetch and query."""
+        col_names = [elt[0] for elt in description]
+        df = _pd.DataFrame(records, columns = col_names)
+
+        # fix for transactions so that they are ordered by id
+        if 'id' in df.columns:
+            df = df.sort_values(by='id')
+            df.index = [i for i in range(len(df.index))]
+            
+        if index_name is None:
+            return df
+        
+        else:
+            return df.set_index(index_name)
+   
+    # --------------------------------------------------------------------------------------------
+    def print_tables(self):
+        """Print database table names and row counts."""
+        try:
+            stats = self.table_statistics(exact=True)
+
+            for table, count in zip(stats.index, stats['row_count']):
+                print('Table: ', table, '--- rows:', str(count))
+        
+        except Exception as e:
+            print(e.args)
+
+    # --------------------------------------------------------------------------------------------
+    def table_statistics(self, exact=False):
+        """
+        Return a df indexed by table name with row counts, table/index/total bytes, insert, update,
+        delete and dead row counters and the last analyze/vacuum time, in one query.
+        exact: count rows (a scan per table, server side) instead of using planner estimates
+        """
+        try:
+            return self.query(query=sql_table_statistics_query, data=(bool(exact),), index_name='table_name')
+
+        except Exception as e:
+            print(e.args)
+     
+    # --------------------------------------------------------------------------------------------
+    def load_dg_exchange_ids(self):
+        """
+        Uses a url link to load exchanges details to a table. You should run this only once.
+        """
+        self.execute_sql(query=sql_exchanges_table_create,data=None)
+        res = _http.get(self.url).json()
+
+        rows = []
+        for e in res['exchanges']:
+            d = {}
+            for item in ['id','hiqAbbr','country','city','name']:
+                try: d[item] = e[item]
+                except: d[item] = '-1'
+
+            rows.append((d['id'], d['hiqAbbr'], d['country'], d['city'], d['name']))
+
+        return self.bulk_write(query=sql_exchange_insert_query, rows=rows)
+    
+    # --------------------------------------------------------------------------------------------
+    def load_ft_funds_data(self, etfs_list=None):
+        """ """
+        
+        if etfs_list is None:
+            
+            # Join tables to read FT funds codes
+            joined_df = self.query(sql_join_3, index_name='exchange_id')
+
+            # Create list of funds to get FT data for
+            etfs_list = list(map(lambda x: x[0]+':'+x[1]+':'+x[2], joined_df[['symbol','ft_exch_code','currency']].values))
+
+        # Read data from FT site
+        funds_data = ft_aggregate(etfs_list).T.rename(columns=_ETFS_DATA_COLUMNS)
+        funds_data = funds_data.loc[[etf for etf in etfs_list if etf in funds_data.index]]
+        
+        # Create or update relevant DB TABLE (etfs_data)
+        self.execute_sql(query=sql_etfs_data_table_create)
+        
+        # Add rows to table (parsed once here, so readers get numbers)
+        return self.bulk_write(query=sql_etfs_data_insert_query, rows=self._etfs_data_rows(funds_data))
+
+    # --------------------------------------------------------------------------------------------
+    def _etfs_data_rows(self, df):
+        """
+        Rows for sql_etfs_data_insert_query from a df of scraped FT strings indexed by ft_symbol:
+        AUM split into bn amount and currency, numbers as floats and missing values as None.
+        """
+        rows = []
+
+        for ft_symbol, fund in df.iterrows():
+            values = {c: _parse_number(fund[c]) for c in _ETFS_DATA_NUMERIC}
+            values.update({c: None if str(fund[c]) in ['-', '-1', 'nan', 'None'] else fund[c]
+                           for c in ['isin', 'ft_currency', 'domicile', 'launch_date']})
+            values['aum'], values['aum_currency'] = _parse_aum(fund['aum'])
+
+            rows.append((ft_symbol,) + tuple(values[c] for c in _ETFS_DATA_INSERT_ORDER))
+
+        return rows
+
+    # --------------------------------------------------------------------------------------------
+    def migrate_etfs_data_table(self):
+        """
+        Rewrite a legacy all-varchar <<etfs_data>> table with typed columns (numeric AUM, expense
+        ratio, sector and top-10 weights, separate AUM currency, NULL instead of -1).
+        """
+        df = self.query('SELECT * FROM etfs_data')
+
+        if 'aum_currency' in df.columns:
+            print('etfs_data is already typed')
+            return
+
+        rows = self._etfs_data_rows(df.set_index('ft_symbol'))
+
+        self.execute_sql(query=sql_etfs_data_table_drop)
+        self.execute_sql(query=sql_etfs_data_table_create)
+
+        return self.bulk_write(query=sql_etfs_data_insert_query, rows=rows)
+        
+    # --------------------------------------------------------------------------------------------
+    def prices_table_update_auto(self, period='P1M', dg=None, assets_list=None, mode='period', max_gap_days=5,
+                                 new_period='P50Y'):
+        """
+        Retrieves time series data and adds them to the prices table. If there is an assets list, only these assets are updated
+        (the summary then has the failed writes in 'errors', {symbol: error}).
+        mode: 'period' requests the same period for every symbol, 'delta' requests only what is missing
+        per symbol (see _prices_delta_sync), period is then ignored
+        new_period: 'delta' mode period requested for symbols with no stored prices (full history)
+        max_gap_days: 'delta' mode back-fills interior gaps longer than this many business days
+        """
+        if mode == 'delta':
+            return self._prices_delta_sync(dg=dg, assets_list=assets_list, new_period=new_period,
+                                           max_gap_days=max_gap_days)
+
+        if assets_list is None:
+            # Retrieve vwd ids / symbols from securities tables
+            securities = self.query("SELECT vwd_id, symbol FROM securities WHERE product_type = 'ETF' ")
+            
+            # Pass the ids / symbols to get price time series
+            data = dg.comp_series(securities=dg._securities_dict(securities),
+                            ts_type='price',
+                            date_range={'auto':period})
+            
+            # Update the prices table using the prices data from degiro
+            return self.prices_table_update_manual(df=data.copy())
+        
+        else:
+            summaries = []
+            for asset in assets_list:
+                # Retrieve vwd ids / symbols from securities tables
+                securities = self.query("SELECT vwd_id, symbol FROM securities WHERE symbol = %s", (asset,))
+
+                # Pass the ids / symbols to get price time series
+                data = dg.comp_series(securities=dg._securities_dict(securities),
+                                ts_type='price',
+                                date_range={'auto':period})
+                
+                # Update the prices table using the prices data from degiro
+                summary = self.prices_table_update_manual(df=data.copy())
+
+                failed = dg.comp_report['error'].dropna()
+                if not len(data.columns) and 'error' not in summary:
+                    summary['error'] = tuple(failed) if len(failed) else ('No prices fetched',)
+
+                summaries.append(summary)
+
+            return {'rows': sum(i['rows'] for i in summaries),
+                    'pages': sum(i['pages'] for i in summaries),
+                    'seconds': sum(i['seconds'] for i in summaries),
+                    'written': [s for i in summaries for s in i['written']],
+                    'skipped': [s for i in summaries for s in i['skipped']],
+                    'errors': {asset: i['error'] for asset, i in zip(assets_list, summaries) if 'error' in i}}
+
+    # --------------------------------------------------------------------------------------------
+    def _missing_windows(self, dates, today, max_gap_days=5, known_empty=()):
+        """
+        Return the 'start:end' ranges missing from a series' stored dates: the days after the last
+        stored date up to the last business day and interior gaps longer than max_gap_days
+        business days, except the gaps in known_empty (already requested and found empty).
+        """
+        days = _np.unique(_pd.DatetimeIndex(dates).values.astype('datetime64[D]'))
+        windows = []
+
+        # Interior gaps (weekends and short holiday runs are not gaps)
+        gaps = _np.nonzero(_np.busday_count(days[:-1] + 1, days[1:]) > max_gap_days)[0]
+        for i in gaps:
+            window = str(days[i] + 1) + ':' + str(days[i + 1] - 1)
+            if window not in known_empty:
+                windows.append(window)
+
+        # Tail since the last stored date (no new prices on weekends)
+        last_business_day = _np.busday_offset(today, 0, roll='backward')
+        if days[-1] < last_business_day:
+            windows.append(str(days[-1] + 1) + ':' + str(last_business_day))
+
+        return windows
+
+    # --------------------------------------------------------------------------------------------
+    def _empty_windows(self, namespace):
+        """ Return {symbol: set of 'start:end'} of the delta sync windows found empty before."""
+        self.execute_sql(query=sql_sync_empty_windows_table_create)
+
+        df = self.query('SELECT symbol, window_start, window_end FROM sync_empty_windows WHERE namespace = %s',
+                        (namespace,))
+        empty = {}
+
+        if df is not None:
+            for symbol, start, end in df.values:
+                window = str(_pd.Timestamp(start).date()) + ':' + str(_pd.Timestamp(end).date())
+                empty.setdefault(symbol, set()).add(window)
+
+        return empty
+
+    # --------------------------------------------------------------------------------------------
+    def _prices_delta_sync(self, dg, assets_list=None, new_period='P50Y', max_gap_days=5):
+        """
+        Request from DeGiro only the windows missing from the prices table (new days since the last
+        stored date and back-filled interior gaps; new_period for symbols with no stored prices).
+        Interior gaps that come back empty are kept in <<sync_empty_windows>> and not requested
+        again. Return the bulk write summary with a 'symbols' df of windows/rows/bytes per symbol.
+        """
+        if assets_list is None:
+            securities = self.query("SELECT vwd_id, symbol FROM securities WHERE product_type = 'ETF' ")
+        else:
+            securities = self.query("SELECT vwd_id, symbol FROM securities WHERE symbol IN ({})".format(
+                ', '.join(['%s']*len(assets_list))), tuple(assets_list))
+
+        securities_list = dg._securities_dict(securities)
+        symbols = [list(security.values())[0] for security in securities_list]
+
+        # Stored dates of every symbol in one read
+        stored = self.series('prices').read(symbols=symbols)
+        if stored is None:
+            stored = _pd.DataFrame()
+
+        today = _np.datetime64(_pd.Timestamp.today().date(), 'D')
+        known_empty = self._empty_windows('prices')
+        frames, report, empty_windows = [], [], []
+
+        for security in securities_list:
+            symbol = list(security.values())[0]
+            dates = stored[symbol].dropna().index if symbol in stored.columns else []
+
+            if len(dates):
+                date_ranges = [{'range': w} for w in self._missing_windows(
+                    dates, today, max_gap_days, known_empty=known_empty.get(symbol, ()))]
+                last_stored = str(_pd.Timestamp(dates.max()).date())
+            else:
+                date_ranges = [{'auto': new_period}]
+
+            logged = len(dg.transfer_log)
+            fetched = [dg.single_series(security=security, ts_type='price', date_range=date_range)
+                       for date_range in date_ranges]
+
+            # Interior gaps answered without data (failed requests return None and are retried)
+            for date_range, ts in zip(date_ranges, fetched):
+                if ts is not None and not len(ts.index) and 'range' in date_range:
+                    start, end = date_range['range'].split(':')
+                    if end < last_stored:
+                        empty_windows.append(('prices', symbol, start, end))
+
+            fetched = [ts for ts in fetched if ts is not None and len(ts.index)]
+
+            if fetched:
+                ts = _pd.concat(fetched)
+                frames.append(ts[~ts.index.duplicated(keep='last')].sort_index())
+
+            transfers = dg.transfer_log[logged:]
+            report.append({'symbol': symbol, 'windows': len(date_ranges),
+                           'rows': sum(i['rows'] for i in transfers),
+                           'bytes': sum(i['bytes'] for i in transfers)})
+
+        if frames:
+            summary = self.prices_table_update_manual(df=_assemble_panel(frames))
+        else:
+            summary = {'rows': 0, 'pages': 0, 'seconds': 0.0, 'written': [], 'skipped': []}
+
+        if empty_windows:
+            self.execute_values(query=sql_sync_empty_windows_insert_query, rows=empty_windows)
+
+        summary['symbols'] = _pd.DataFrame(report, columns=['symbol', 'windows', 'rows', 'bytes']).set_index('symbol')
+
+        return summary
+
+    # --------------------------------------------------------------------------------------------
+    def prices_table_update_manual(self, df):
+        """ Upsert a dates x symbols df of prices. Return a bulk write summary."""
+        return self.series('prices').write(df)
+
+    # --------------------------------------------------------------------------------------------
+    def migrate_prices_table(self, assets_list=None):
+        """
+        Copy the JSON blob rows of the prices table to the normalized prices_daily table. Blob rows
+        are left in place, so the migration can be re-run safely before switching prices_layout.
+        """
+        self.execute_sql(query=sql_prices_daily_table_create)
+
+        layout, self.prices_layout = self.prices_layout, 'blob'
+        try:
+            existing_data = self._read_price_time_series_data(assets_list=assets_list)
+        finally:
+            self.prices_layout = layout
+
+        summary = self.series('prices')._write_daily(existing_data)
+        print('Migrated', len(existing_data.columns), 'symbols to prices_daily')
+
+        return summary
+    
+    # --------------------------------------------------------------------------------------------
+    def migrate_transactions_table(self):
+        """
+        Convert the varchar dd/mm/YYYY transaction_date column to a date column and index it by
+        date and symbol/date. Safe to re-run.
+        """
+        self.execute_sql(query=self._transactions_migrate_query)
+        print('Migrated transactions table to typed dates')
+
+    # --------------------------------------------------------------------------------------------
+    def transactions_table_update(self, df):
+        """
+        Upsert transactions from a df with the transactions table columns (id, symbol,
+        transaction_price, transaction_quantity, transaction_type, transaction_date).
+        Return a bulk write summary.
+        """
+        self.execute_sql(query=sql_transactions_table_create)
+
+        rows = list(zip(df['id'].astype(int).tolist(),
+                        df['symbol'],
+                        df['transaction_price'].astype(float).tolist(),
+                        df['transaction_quantity'].astype(int).tolist(),
+                        df['transaction_type'],
+                        _pd.to_datetime(df['transaction_date'], dayfirst=True).dt.date))
+
+        summary = self.bulk_write(query=sql_transactions_insert_query, rows=rows)
+        self._notify_change('transactions', sorted(set(df['symbol'])))
+
+        return summary
+
+    # --------------------------------------------------------------------------------------------
+    def _notify_change(self, namespace, symbols):
+        """ Broadcast written symbols to other processes (HerokuDB sends a NOTIFY, see listen)."""
+
+    # --------------------------------------------------------------------------------------------
+    def rates_table_update(self, df=None):
+        """ Update rates table with df or auto (if df is None). Return a bulk write summary."""
+
+        if df is None:
+            df = update_govt_yields()
+
+        return self.series('rates').write(df)
+
+    # --------------------------------------------------------------------------------------------
+    def volumes_table_update_auto(self, period='P1M', dg=None, assets_list=None):
+        """
+        Retrieve DeGiro volume series of the ETFs in <<securities>> (or assets_list) and upsert them
+        to the 'volumes' namespace. Return a bulk write summary.
+        """
+        query = "SELECT vwd_id, symbol FROM securities WHERE product_type = 'ETF' "
+        securities = dg._securities_dict(self.query(query), assets=assets_list)
+
+        data = dg.comp_series(securities=securities, ts_type='volume', date_range={'auto': period})
+
+        return self.series('volumes').write(data)
+
+    # --------------------------------------------------------------------------------------------
+    def series(self, namespace):
+        """
+        Return the TimeSeriesStore of a namespace: 'prices', 'rates', 'volumes' or any other name
+        (stored in the shared <<series>> table), e.g. db.series('volumes').read(['SWDA']).
+        """
+        return TimeSeriesStore(self, namespace)
+
+    # --------------------------------------------------------------------------------------------
+    def series_meta_backfill(self):
+        """
+        Create <<series_meta>> and add version 1 for every stored series that has no entry yet.
+        Run once on databases written before series_meta existed.
+        """
+        self.execute_sql(query=sql_series_meta_table_create)
+        self.execute_sql(query=sql_series_meta_backfill_prices)
+        self.execute_sql(query=sql_series_meta_backfill_rates)
+        self.execute_sql(query=sql_series_table_create)
+        self.execute_sql(query=sql_series_meta_backfill_series)
+
+        if self.prices_layout == 'normalized':
+            self.execute_sql(query=sql_series_meta_backfill_prices_daily)
+
+    # --------------------------------------------------------------------------------------------
+    def migrate_blob_codec(self):
+        """
+        Add the data_bin column to the prices and rates tables and re-encode every legacy JSON row
+        with the binary codec. Switches this instance to blob_codec='binary'.
+        """
+        for query in self._add_data_bin_queries:
+            self.execute_sql(query=query)
+
+        layout, self.prices_layout = self.prices_layout, 'blob'
+        try:
+            prices = self._read_price_time_series_data()
+        finally:
+            self.prices_layout = layout
+        rates = self.rates_table_read()
+
+        self.blob_codec = 'binary'
+        for namespace, df in [('prices', prices), ('rates', rates)]:
+            self.series(namespace)._write_blobs(df)
+
+        print('Re-encoded', len(prices.columns), 'prices and', len(rates.columns), 'rates rows')
+
+    # --------------------------------------------------------------------------------------------
+    def rates_table_read(self, term_spread=False, rate=None, start=None, end=None):
+        """ Read from rates table. start, end: optional date range, e.g. '2020-01-01'"""
+        try:
+            results = self.series('rates').read(symbols=None if rate is None else [rate],
+                                                start=start, end=end)
+
+            if term_spread:
+                # Create arrays for the features and the response variable
+                results['US_2Y_3M']  = results['US_2Y']  - results['US_3M']
+                results['US_10Y_3M'] = results['US_10Y'] - results['US_3M']
+                results['US_10Y_2Y'] = results['US_10Y'] - results['US_2Y']
+                results['US_30Y_5Y'] = results['US_30Y'] - results['US_5Y']
+
+                results['GE_2Y_3M']  = results['GE_2Y']  - results['EA_3M']
+                results['GE_10Y_3M'] = results['GE_10Y'] - results['EA_3M']
+                results['GE_10Y_2Y'] = results['GE_10Y'] - results['GE_2Y']
+                results['GE_30Y_5Y'] = results['GE_30Y'] - results['GE_5Y']
+
+            return results
+
+        except Exception as e:
+            print(e.args)
+            
+    # --------------------------------------------------------------------------------------------
+    def _read_price_time_series_data(self, assets_list=None, portfolio=True, start=None, end=None):
+        """
+        Read prices for assets_list (all symbols if None). start, end: optional date range that is
+        pushed down to the query (normalized layout) or to the blob decoder (blob layout).
+        """
+        return self.series('prices').read(symbols=assets_list, start=start, end=end)
+
+    # --------------------------------------------------------------------------------------------
+    def prices_table_read(self, assets_list=None, portfolio=True, cash=100000, start=None, end=None):
+        """
+        Read asset prices plus CASH and (optionally) the PORT series. start, end: optional date
+        range read from storage, e.g. '2020-03-25'
+        """
+        results = self._read_price_time_series_data(assets_list=assets_list, portfolio=portfolio,
+                                                    start=start, end=end)
+        if 'CASH' not in results.columns:
+            results['CASH'] = cash
+        if portfolio:
+                port = self._portfolio_series()
+                results = _pd.concat([results, port.loc[start:end]],axis=1)
+        
+        return results.ffill()
+
+    # --------------------------------------------------------------------------------------------
+    def _portfolio_series(self):
+        """
+        Return the PORT series, recomputed only when the transactions table or the price version
+        of a held symbol changed since the last call (see sql_portfolio_fingerprint_query).
+        """
+        # The fingerprint reads <<series_meta>>, missing until the first versioned write
+        self.execute_sql(query=sql_series_meta_table_create)
+
+        fingerprint = self.query(self._portfolio_fingerprint_query)
+        fingerprint = None if fingerprint is None else tuple(fingerprint.iloc[0])
+
+        cached_fingerprint, cached_port = self._port_cache
+        if fingerprint is not None and fingerprint == cached_fingerprint:
+            return cached_port
+
+        port = Portfolio(heroku_conn=self).fetch_data()['PORT']
+        self._port_cache = (fingerprint, port)
+
+        return port
+
+    # --------------------------------------------------------------------------------------------
+    def insert_new_asset(self, dg_search_result=None, asset=None, asset_segment=None, ft_suffix=None, dg=None):
+        """Provide all 5 arguments to call this functions"""
+        if all(i is not None for i in [dg_search_result, asset, asset_segment, ft_suffix, dg]):
+            
+            # Insert new security to <<securities>> table
+            self.execute_sql(sql_security_insert_query,
+                             self.clean_degiro_search(dg_search_result))
+
+            # Insert segment for new security to <<market_segments>> table
+            self.execute_sql(sql_market_segments_insert_query,(asset,asset_segment))
+
+            # Insert price time series data to <<prices>> table
+            self.prices_table_update_auto(period='P50Y',dg=dg, assets_list=[asset])
+
+            # Scrap FT data and add to <<etfs_data>> table
+            self.load_ft_funds_data(etfs_list=[asset+':'+ft_suffix])
+
+        else:
+            print('Insert every argument to proceed.')
+    
+    # --------------------------------------------------------------------------------------------
+    def market_segments_info(self):
+
+        ms = self.query("""SELECT securities.symbol, name, segment
+                           FROM securities
+                           JOIN market_segments
+                           ON securities.symbol=market_segments.symbol""")
+        ms.index = ms.symbol
+        ms.loc['PORT',:] = ['PORT','Portfolio','Portfolio']
+        ms.loc['CASH',:] = ['CASH','Cash','Cash']
+
+        return ms
+    
+    # --------------------------------------------------------------------------------------------
\ No newline at end of file
@@ -1,6 +1,6 @@
 import numpy as _np
 import pandas as _pd
-import requests as _requests
+from ._http import http_client as _http
 import json as _json
 from ._portfolio import Portfolio
 
@@ -13,7 +13,7 @@ def _ishares_constituents(ishares_id, weight):
         suffix = '/fund/1506575576011.ajax?tab=all&fileType=json'
         url = 'https://www.ishares.com/uk/individual/en/products/'+ishares_id+suffix
         
-        res = _requests.get(url)
+        res = _http.get(url)
         clean_data = _json.loads(res.content)['aaData']
 
         dct = {}
@@ -88,8 +88,7 @@ def table_portfolio_concentration(assets_list=None, weights=None, db=None, verbo
     group_by = 'Security'
     
     # Query ishares table and convert DF to a dictionary of ETF symbols and their respective iShares ids
-    db.execute_sql('SELECT * FROM ishares')
-    ishares = db.fetch().set_index('symbol').to_dict()['ishares_id']
+    ishares = db.query('SELECT * FROM ishares').set_index('symbol').to_dict()['ishares_id']
     
     # Weights list if none is passed
     if weights is None:
@@ -122,14 +121,17 @@ def table_fund_details(assets_list=None, db=None):
     """
     
     """
-    db.execute_sql('SELECT * FROM etfs_data')
-    df = db.fetch()
+    df = db.query('SELECT * FROM etfs_data')
     df['symbol'] = list(map(lambda x: x.split(':')[0], df.ft_symbol))
     
     if assets_list is None:
         assets_list = df['symbol'].values
     
     df = df[df.symbol.isin(assets_list)]
+
+    # Fund size in its own currency, e.g. 'GBP 1.23'
+    aum = df['aum'].astype(float)
+    df['aum'] = (df['aum_currency'].fillna('') + ' ' + aum.map('{:,.2f}'.format)).str.strip().where(aum.notna(), '-')
     
     # Selected columns
     df = df[['symbol','isin','launch_date','aum','exp_ratio','top_10',
@@ -143,19 +145,10 @@ def table_fund_details(assets_list=None, db=None):
                     'sec_financials':'Fin','sec_communications':'Telco',
                     'sec_cyclicals':'Cycl','sec_defensives':'Def'},axis=1)
     
-    # Make AUM to appear as float
-    df['AUM-bn'] = list(map(lambda x: float(x.split('GBP')[1].replace(' ','').replace('<','').replace('bn','')),df['AUM-bn']))
-
-    # Change some columns' dtype to float
+    # Columns are numeric in the table, NULL (missing) weights are shown as 0
     labels_2p = ['Expense']
     labels_1p = ['Top-10','InfoTech','HCare','Fin','Telco','Cycl','Def']
-    labels = labels_1p + labels_2p
-
-    for col in labels:
-        df[col] = df[col].astype(float)
-    
-    # Replace -1 with NaN
-    df = df.replace(-1.0, 0)
+    df[labels_1p + labels_2p] = df[labels_1p + labels_2p].astype(float).fillna(0)
 
     # Change column format
     df[labels_2p] = (df[labels_2p]).applymap('{:,.2f}%'.format)
@@ -0,0 +1,290 @@
+import pandas as _pd
+from ._sql_statements import *
+from ._utilities import _convert_df_to_str, _convert_df_to_bin, _convert_blob_to_df, _assemble_panel, _series_hash
+
+# Blob table and insert statements (json, binary codec) per namespace; other namespaces share
+# the <<series>> table and are told apart by its namespace column
+_BLOB_TABLES = {'prices': ('prices', sql_prices_table_create, sql_prices_insert_query, sql_prices_bin_insert_query),
+                'rates': ('rates', sql_rates_table_create, sql_rates_insert_query, sql_rates_bin_insert_query)}
+
+_SHARED_TABLE = ('series', sql_series_table_create, sql_series_insert_query, sql_series_bin_insert_query)
+
+
+class TimeSeriesStore:
+    '''
+    Dates x symbols series of one namespace ('prices', 'rates', 'volumes', derived metrics, ...)
+    stored in a QlabDB. Every namespace shares the blob codec, one-query bulk reads and writes,
+    date range pushdown, <<series_meta>> versions, the local mirror and change notifications.
+    '''
+
+    def __init__(self, db, namespace):
+        self.db = db
+        self.namespace = namespace
+        self.table, self._create_query, self._json_query, self._bin_query = _BLOB_TABLES.get(namespace, _SHARED_TABLE)
+
+    # --------------------------------------------------------------------------------------------
+    @property
+    def normalized(self):
+        """ True when prices are kept one row per symbol/date in <<prices_daily>>."""
+        return self.namespace == 'prices' and self.db.prices_layout == 'normalized'
+
+    # --------------------------------------------------------------------------------------------
+    def write(self, df):
+        """
+        Upsert a dates x symbols df: stored observations are kept unless df overrides them. Blob
+        rows whose merged content hash matches <<series_meta>> are not rewritten. Return a bulk
+        write summary with the written and skipped symbols (none written if the write failed).
+        """
+        symbols = list(df.columns)
+        if not symbols:
+            return {'rows': 0, 'pages': 0, 'seconds': 0.0, 'written': [], 'skipped': []}
+
+        stored_hashes = self._content_hashes(symbols)
+
+        if self.table == 'series':
+            self.db.execute_sql(query=self._create_query)
+
+        if self.normalized:
+            # Only the passed observations are upserted, there is no row rewrite to skip
+            hashes, written = dict.fromkeys(symbols), symbols
+            summary = self._write_daily(df)
+
+        else:
+            merged = df.combine_first(self._stored(symbols))[symbols]
+            hashes = {symbol: _series_hash(merged[symbol]) for symbol in symbols}
+            written = [symbol for symbol in symbols if hashes[symbol] != stored_hashes.get(symbol)]
+
+            summary = self._write_blobs(merged[written]) if written else {'rows': 0, 'pages': 0, 'seconds': 0.0}
+
+        skipped = [s for s in symbols if s not in written]
+
+        # A failed write keeps the stored hashes, so that the same data is written again next time
+        if 'error' in summary:
+            written = []
+
+        elif written:
+            self._bump_versions(written, hashes)
+            self.db._notify_change(self.namespace, written)
+
+        summary['written'], summary['skipped'] = written, skipped
+
+        return summary
+
+    # --------------------------------------------------------------------------------------------
+    def _content_hashes(self, symbols):
+        """
+        Return {symbol: content_hash} from <<series_meta>>, creating the table or adding the
+        content_hash column when missing. Empty if symbols is empty or the table cannot be read.
+        """
+        if not symbols:
+            return {}
+
+        self.db.execute_sql(query=sql_series_meta_table_create)
+
+        query = 'SELECT * FROM series_meta WHERE namespace = %s AND symbol IN ({})'.format(
+            ', '.join(['%s']*len(symbols)))
+        meta = self.db.query(query=query, data=(self.namespace, *symbols))
+
+        if meta is None:
+            return {}
+
+        if 'content_hash' not in meta.columns:
+            self.db.execute_sql(query=sql_series_meta_add_content_hash)
+            return {}
+
+        return dict(zip(meta['symbol'], meta['content_hash']))
+
+    # --------------------------------------------------------------------------------------------
+    def _stored(self, symbols):
+        """ Stored series of symbols (only these columns, possibly none)."""
+        stored = self._read_from_db(symbols=symbols)
+        if stored is None:
+            return _pd.DataFrame()
+
+        return stored[[c for c in symbols if c in stored.columns]]
+
+    # --------------------------------------------------------------------------------------------
+    def _write_blobs(self, df):
+        """ Encode every column of df with the db's blob codec and upsert all rows in one batch."""
+        if self.db.blob_codec == 'binary':
+            query, encode = self._bin_query, _convert_df_to_bin
+        else:
+            query, encode = self._json_query, _convert_df_to_str
+
+        key = () if self.table == self.namespace else (self.namespace,)
+        rows = [key + (column, encode(df, column=column)) for column in df.columns]
+
+        return self.db.bulk_write(query=query, rows=rows)
+
+    # --------------------------------------------------------------------------------------------
+    def _write_daily(self, df):
+        """
+        Upsert only the passed observations to the prices_daily table (one row per symbol/date).
+        """
+        # Wide (dates x symbols) to long (symbol, date, price) rows
+        long_df = df.stack().dropna().reset_index()
+        long_df.columns = ['date', 'symbol', 'price']
+
+        rows = list(zip(long_df['symbol'],
+                        _pd.to_datetime(long_df['date']).dt.date,
+                        long_df['price'].astype(float)))
+
+        return self.db.bulk_write(query=sql_prices_daily_insert_query, rows=rows)
+
+    # --------------------------------------------------------------------------------------------
+    def _bump_versions(self, symbols, hashes):
+        """
+        Increment the <<series_meta>> version (used by the local mirror) and store the content hash
+        of written series.
+        """
+        self.db.execute_values(query=sql_series_meta_bump_query,
+                               rows=[(self.namespace, symbol, hashes[symbol]) for symbol in symbols])
+
+    # --------------------------------------------------------------------------------------------
+    def read(self, symbols=None, start=None, end=None):
+        """
+        Read symbols (all if None) restricted to start/end, from the local mirror when the db has
+        one. Symbols whose <<series_meta>> version changed are downloaded (full history) first;
+        symbols with no version (all of them if <<series_meta>> is missing) are read from the
+        database directly.
+        """
+        mirror = self.db.mirror
+        if mirror is None:
+            return self._read_from_db(symbols=symbols, start=start, end=end)
+
+        try:
+            versions = self.versions(symbols=symbols)
+            if not versions:
+                return self._read_from_db(symbols=symbols, start=start, end=end)
+
+            mirrored = list(versions)
+
+            stale = mirror.stale(self.namespace, versions)
+            if stale:
+                downloaded = self._read_from_db(symbols=stale)
+                mirror.write(self.namespace, downloaded, versions)
+
+                # Versioned symbols without stored data are skipped
+                mirrored = [s for s in mirrored if s not in stale or s in downloaded.columns]
+
+            frames = mirror.read(self.namespace, mirrored, start=start, end=end)
+
+            stored = self._stored_symbols() if symbols is None else symbols
+            unversioned = [s for s in stored if s not in versions]
+            if unversioned:
+                direct = self._read_from_db(symbols=unversioned, start=start, end=end)
+                frames += [direct[[s]] for s in direct.columns]
+
+            return _assemble_panel(frames)
+
+        except Exception as e:
+            print(e.args)
+            return self._read_from_db(symbols=symbols, start=start, end=end)
+
+    # --------------------------------------------------------------------------------------------
+    def versions(self, symbols=None):
+        """ Return {symbol: version} from <<series_meta>> (all symbols if None), {} if it cannot be read."""
+        query = 'SELECT symbol, version FROM series_meta WHERE namespace = %s'
+        data = [self.namespace]
+
+        if symbols is not None:
+            query += ' AND symbol IN ({})'.format(', '.join(['%s']*len(symbols)))
+            data += list(symbols)
+
+        df = self.db.query(query=query, data=tuple(data))
+        if df is None:
+            return {}
+
+        return dict(zip(df['symbol'], df['version'].astype(int)))
+
+    # --------------------------------------------------------------------------------------------
+    def _stored_symbols(self):
+        """ Symbols with stored data in the namespace's table."""
+        if self.normalized:
+            df = self.db.query(query='SELECT DISTINCT symbol FROM prices_daily')
+        elif self.table == 'series':
+            df = self.db.query(query='SELECT symbol FROM series WHERE namespace = %s', data=(self.namespace,))
+        else:
+            df = self.db.query(query='SELECT symbol FROM {}'.format(self.table))
+
+        return [] if df is None else list(df['symbol'])
+
+    # --------------------------------------------------------------------------------------------
+    def _read_from_db(self, symbols=None, start=None, end=None):
+        """ Read series from the database (blob rows or prices_daily)."""
+        if self.normalized:
+            return self._read_daily(symbols=symbols, start=start, end=end)
+
+        try:
+            conditions, data = [], []
+
+            if self.table == 'series':
+                conditions.append('namespace = %s')
+                data.append(self.namespace)
+
+            if symbols is not None:
+                conditions.append('symbol IN ({})'.format(', '.join(['%s']*len(symbols))))
+                data += list(symbols)
+
+            query = 'SELECT * FROM {}'.format(self.table)
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+
+            # Fetch data and create a data frame
+            df = self._blobs_frame(self.db.query(query=query, data=tuple(data) or None))
+
+            return self._decode_blobs(df, start=start, end=end)
+
+        except Exception as e:
+            print(e.args)
+
+    # --------------------------------------------------------------------------------------------
+    def _blobs_frame(self, df):
+        """ Index blob rows by symbol, with data_bin even on legacy tables."""
+        df = df.set_index('symbol')
+
+        if 'data_bin' not in df.columns:
+            df['data_bin'] = None
+
+        return df
+
+    # --------------------------------------------------------------------------------------------
+    def _decode_blobs(self, df, start=None, end=None):
+        """ Decode every blob row first, then assemble the dates x symbols frame in one pass."""
+        frames = [_convert_blob_to_df(data, symbol, data_bin, start=start, end=end)
+                  for symbol, data, data_bin in zip(df.index, df['data'], df['data_bin'])]
+
+        return _assemble_panel(frames)
+
+    # --------------------------------------------------------------------------------------------
+    def _read_daily(self, symbols=None, start=None, end=None):
+        """ Read the normalized prices_daily table and pivot it to a dates x symbols frame."""
+        try:
+            query = 'SELECT symbol, date, price FROM prices_daily'
+            conditions, data = [], []
+
+            if symbols is not None:
+                conditions.append('symbol IN ({})'.format(', '.join(['%s']*len(symbols))))
+                data += list(symbols)
+
+            if start is not None:
+                conditions.append('date >= %s')
+                data.append(_pd.Timestamp(start).date())
+
+            if end is not None:
+                conditions.append('date <= %s')
+                data.append(_pd.Timestamp(end).date())
+
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+
+            df = self.db.fetch_all(query=query, data=tuple(data) or None)
+
+            results = df.pivot(index='date', columns='symbol', values='price')
+            results.index = _pd.to_datetime(results.index)
+            results.index.name, results.columns.name = 'Dates', None
+
+            return results
+
+        except Exception as e:
+            print(e.args)
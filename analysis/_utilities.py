@@ -1,25 +1,230 @@
 import pandas as _pd
 import numpy as _np
 import json as _json
+import struct as _struct
+import zlib as _zlib
+import hashlib as _hashlib
 
 # --------------------------------------------------------------------------------------------
-def _convert_str_to_df(string, column):
+# JSON series codec: '[["YYYY/mm/dd SS:MM:HH", value], ...]' (the format stored in prices/rates)
+_JSON_DATE_FORMAT = '%Y/%m/%d %S:%M:%H'
+
+# Byte positions of an ISO 'YYYY-MM-DDTHH:MM:SS' string rearranged to _JSON_DATE_FORMAT
+_JSON_DATE_FROM_ISO = _np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 17, 18, 13, 14, 15, 16, 11, 12])
+_JSON_DATE_SEPARATORS = {4: b'/', 7: b'/', 10: b' ', 13: b':', 16: b':'}
+
+def _format_json_dates(index):
+    """ Format a DatetimeIndex with _JSON_DATE_FORMAT using numpy byte operations."""
+    iso = _np.datetime_as_string(_pd.DatetimeIndex(index).values.astype('datetime64[s]'), unit='s')
+
+    raw = iso.astype('S19').view(_np.uint8).reshape(-1, 19)[:, _JSON_DATE_FROM_ISO]
+    for position, separator in _JSON_DATE_SEPARATORS.items():
+        raw[:, position] = ord(separator)
+
+    return _np.ascontiguousarray(raw).view('S19').ravel().astype('U19').tolist()
+
+def _parse_json_dates(strings):
+    """
+    Parse strings in _JSON_DATE_FORMAT to a DatetimeIndex using fixed byte positions. Falls back
+    to pandas with the explicit format if any string does not match the fixed layout.
+    """
+    raw = _np.array(strings, dtype='S20')
+
+    if raw.size == 0 or _np.char.str_len(raw).min() != 19 or _np.char.str_len(raw).max() != 19:
+        return _pd.to_datetime(strings, format=_JSON_DATE_FORMAT)
+
+    raw = raw.astype('S19').view(_np.uint8).reshape(-1, 19)
+    if any((raw[:, position] != ord(separator)).any() for position, separator in _JSON_DATE_SEPARATORS.items()):
+        return _pd.to_datetime(strings, format=_JSON_DATE_FORMAT)
+
+    digits = raw.astype(_np.int64) - ord('0')
+    number = lambda start, width: sum(digits[:, start+i] * 10**(width-1-i) for i in range(width))
+
+    months = (number(0, 4) - 1970) * 12 + number(5, 2) - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]') + (number(8, 2) - 1)
+    seconds = number(17, 2) * 3600 + number(14, 2) * 60 + number(11, 2)
+
+    return _pd.DatetimeIndex((days.astype('datetime64[s]') + seconds.astype('timedelta64[s]')).astype('datetime64[ns]'))
+
+def _date_bounds(start=None, end=None):
+    """ Return start/end (any format pd.Timestamp accepts, or None) as datetime64[ns] bounds."""
+    lower = _np.datetime64('NaT') if start is None else _pd.Timestamp(start).to_datetime64()
+    upper = _np.datetime64('NaT') if end is None else _pd.Timestamp(end).to_datetime64()
+
+    return lower.astype('datetime64[ns]'), upper.astype('datetime64[ns]')
+
+def _date_mask(index, start=None, end=None):
+    """ Boolean mask of a datetime64 array for start <= date <= end (None means unbounded)."""
+    lower, upper = _date_bounds(start, end)
+    mask = _np.ones(len(index), dtype=bool)
+
+    if not _np.isnat(lower):
+        mask &= index >= lower
+    if not _np.isnat(upper):
+        mask &= index <= upper
+
+    return mask
+
+def _convert_str_to_df(string, column, start=None, end=None):
     
     literal = _json.loads(string)
-    
-    df = _pd.DataFrame([(i[0],i[1]) for i in literal],columns=['Dates',column]).set_index('Dates')
-    df.index = _pd.to_datetime(df.index)
+
+    # Column-wise unpacking of the [date, value] pairs
+    dates, values = (list(i) for i in zip(*literal)) if literal else ([], [])
+    index = _parse_json_dates(dates)
+
+    df = _pd.DataFrame({column: values}, index=index)
+    df.index.name = 'Dates'
+
+    if start is not None or end is not None:
+        df = df[_date_mask(index.values, start, end)]
     
     return df
 
 def _convert_df_to_str(df,column):
     sup_df = df[column].dropna()
-    ts = [(i[0].to_pydatetime().strftime('%Y/%m/%d %S:%M:%H'),i[1]) for i in sup_df.items()]
 
-    ts_as_string = _json.dumps(ts)
+    if sup_df.empty:
+        return _json.dumps([])
+
+    # Same output as json.dumps of [(date_string, value), ...]
+    dates = _format_json_dates(sup_df.index)
+    values = _json.dumps(sup_df.values.tolist())[1:-1].split(', ')
+
+    ts_as_string = '[' + ', '.join(map('["{}", {}]'.format, dates, values)) + ']'
     
     return ts_as_string
 
+# --------------------------------------------------------------------------------------------
+def _series_hash(series):
+    """
+    Content hash of a date-indexed series (epoch-days and float64 values of its observations),
+    the same whichever blob codec stores it.
+    """
+    series = series.dropna()
+    days = _pd.DatetimeIndex(series.index).values.astype('datetime64[D]').astype('<i8')
+
+    return _hashlib.sha1(days.tobytes() + series.values.astype('<f8').tobytes()).hexdigest()
+
+# --------------------------------------------------------------------------------------------
+# Binary series codec: header (magic, version, flags, n) followed by
+#   version 1: int64 epoch-days + float64 values
+#   version 2: chunk count, chunk table (first day, last day, n, bytes) and per-chunk payloads of
+#              int64 epoch-days + float64 values, so reads for a date range skip other chunks
+_BIN_MAGIC = b'QLTS'
+_BIN_VERSION = 2
+_BIN_FLAG_ZLIB = 1
+_BIN_HEADER = _struct.Struct('<4sBBxxQ')
+_BIN_CHUNK_COUNT = _struct.Struct('<I')
+_BIN_CHUNK = _struct.Struct('<qqII')
+_BIN_CHUNK_SIZE = 256
+
+def _convert_df_to_bin(df, column, compress=True, chunk_size=_BIN_CHUNK_SIZE):
+    """
+    Encode a single column of a date-indexed df to bytes (for a bytea column).
+    compress: zlib-compress each chunk payload
+    chunk_size: observations per independently decodable chunk
+    """
+    sup_df = df[column].dropna().sort_index()
+
+    days = _pd.DatetimeIndex(sup_df.index).values.astype('datetime64[D]').astype('<i8')
+    values = sup_df.values.astype('<f8')
+
+    chunks, payloads = [], []
+    for i in range(0, len(values), chunk_size):
+        payload = days[i:i+chunk_size].tobytes() + values[i:i+chunk_size].tobytes()
+        if compress:
+            payload = _zlib.compress(payload)
+
+        chunks.append(_BIN_CHUNK.pack(days[i], days[i:i+chunk_size][-1],
+                                      len(values[i:i+chunk_size]), len(payload)))
+        payloads.append(payload)
+
+    flags = _BIN_FLAG_ZLIB if compress else 0
+
+    return b''.join([_BIN_HEADER.pack(_BIN_MAGIC, _BIN_VERSION, flags, len(values)),
+                     _BIN_CHUNK_COUNT.pack(len(chunks))] + chunks + payloads)
+
+def _convert_bin_to_df(blob, column, start=None, end=None):
+    """
+    Decode bytes produced by _convert_df_to_bin to a single column df. With start/end only the
+    chunks overlapping the date range are decompressed.
+    """
+    buffer = memoryview(blob)
+    magic, version, flags, n = _BIN_HEADER.unpack_from(buffer)
+
+    if magic != _BIN_MAGIC or version > _BIN_VERSION:
+        raise ValueError('Unknown series encoding (version {})'.format(version))
+
+    offset = _BIN_HEADER.size
+
+    if version == 1:
+        chunks = [(None, None, n, len(buffer) - offset)]
+    else:
+        n_chunks, = _BIN_CHUNK_COUNT.unpack_from(buffer, offset)
+        offset += _BIN_CHUNK_COUNT.size
+        chunks = [_BIN_CHUNK.unpack_from(buffer, offset + i*_BIN_CHUNK.size) for i in range(n_chunks)]
+        offset += n_chunks*_BIN_CHUNK.size
+
+    lower, upper = (b.astype('datetime64[D]').astype('int64') if not _np.isnat(b) else None
+                    for b in _date_bounds(start, end))
+
+    days, values = [], []
+    for first, last, count, nbytes in chunks:
+        payload, offset = buffer[offset:offset+nbytes], offset+nbytes
+
+        # Skip chunks entirely outside the requested range
+        if first is not None and ((lower is not None and last < lower) or (upper is not None and first > upper)):
+            continue
+
+        if flags & _BIN_FLAG_ZLIB:
+            payload = _zlib.decompress(payload)
+
+        days.append(_np.frombuffer(payload, dtype='<i8', count=count))
+        values.append(_np.frombuffer(payload, dtype='<f8', count=count, offset=8*count))
+
+    days = _np.concatenate(days) if days else _np.array([], dtype='<i8')
+    values = _np.concatenate(values) if values else _np.array([], dtype='<f8')
+
+    index = days.astype('datetime64[D]').astype('datetime64[ns]')
+
+    if start is not None or end is not None:
+        mask = _date_mask(index, start, end)
+        index, values = index[mask], values[mask]
+
+    return _pd.DataFrame({column: values}, index=_pd.DatetimeIndex(index, name='Dates'))
+
+def _convert_blob_to_df(data, column, data_bin=None, start=None, end=None):
+    """
+    Decode a stored series: legacy JSON text when present (binary writes set it to NULL),
+    binary column otherwise. start, end: optional date range to decode
+    """
+    if data is not None:
+        return _convert_str_to_df(data, column, start=start, end=end)
+
+    return _convert_bin_to_df(data_bin, column, start=start, end=end)
+
+
+# --------------------------------------------------------------------------------------------
+def _assemble_panel(frames):
+    """
+    Assemble single column date-indexed dfs into one dates x columns df. The union index is built
+    once and values are written to a preallocated array (same result as a concat along axis=1).
+    frames: list of single column dfs, e.g. the output of _convert_blob_to_df
+    """
+    if not frames:
+        return _pd.DataFrame()
+
+    indexes = [_pd.DatetimeIndex(f.index).values.astype('datetime64[ns]') for f in frames]
+    union = _np.unique(_np.concatenate(indexes))
+
+    panel = _np.full((len(union), len(frames)), _np.nan)
+    for j, (frame, index) in enumerate(zip(frames, indexes)):
+        panel[_np.searchsorted(union, index), j] = frame.iloc[:, 0].values
+
+    columns = [f.columns[0] for f in frames]
+
+    return _pd.DataFrame(panel, index=_pd.DatetimeIndex(union, name='Dates'), columns=columns)
 
 # --------------------------------------------------------------------------------------------
 def utils_control(data, rf=0, freq=252, ignore_na=False, asset_list=None, start=None, end=None):
@@ -1,8 +1,11 @@
 import pandas as _pd
 import pandas_datareader as _pdr
-import requests as _req
+from ._http import http_client as _http
 from bs4 import BeautifulSoup as _BeautifulSoup
 
+# FRED host, pandas_datareader requests go through its pooled session
+_FRED_URL = 'https://fred.stlouisfed.org'
+
 
     
 def update_us_treasuries(start_date='2020-01-01', update_last_n_days=20):
@@ -10,7 +13,7 @@ def update_us_treasuries(start_date='2020-01-01', update_last_n_days=20):
     Fetch bond yields for US Treasuries from Fred service
     '''
     df = _pdr.fred.FredReader(['DTB3','DGS2','DGS5','DGS10','DGS30'],
-                                start=start_date).read().ffill()
+                                start=start_date, session=_http.session(_FRED_URL)).read().ffill()
      
 
     df.columns = ['US_3M','US_2Y','US_5Y','US_10Y','US_30Y']
@@ -27,7 +30,7 @@ def update_us_recession():
     '''
     Fetch NBER's US recession flags (daily)
     '''
-    usrec = _pdr.fred.FredReader(['USRECD'], start='1954-01-04').read()
+    usrec = _pdr.fred.FredReader(['USRECD'], start='1954-01-04', session=_http.session(_FRED_URL)).read()
     
     usrec.columns = ['US_REC']
     usrec.index.name = ''
@@ -52,7 +55,7 @@ def update_german_bunds(start_date='2020-01-01', update_last_n_days=20):
         url = "https://api.statistiken.bundesbank.de/rest/data/BBK01/{tsid}?".format(tsid=ge_dict[i])
         params = "detail=dataonly&startPeriod="+start_date
         
-        response = _req.get(url+params)
+        response = _http.get(url+params)
         
         items = _BeautifulSoup(response.text,'lxml-xml').find_all('Obs')
         
@@ -113,7 +116,7 @@ def update_euro_area_yields(update_last_n_days=None):
     
     for i in dct:
         url = "https://sdw-wsrest.ecb.europa.eu/service/data/YC/{bid}?format=jsondata".format(bid=dct[i])
-        response = _req.get(url).json()
+        response = _http.get(url).json()
         
         dt = convert_to_pd(response)
         dt.columns = [i]
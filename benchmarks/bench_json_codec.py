@@ -0,0 +1,51 @@
+"""
+Benchmark of the vectorized JSON series codec against the previous per-item implementation.
+Run from the directory that contains qlab: python -m qlab.benchmarks.bench_json_codec
+"""
+import json as _json
+import timeit as _timeit
+import numpy as _np
+import pandas as _pd
+from qlab.analysis._utilities import _convert_df_to_str, _convert_str_to_df
+
+# --------------------------------------------------------------------------------------------
+def _legacy_convert_str_to_df(string, column):
+
+    literal = _json.loads(string)
+
+    df = _pd.DataFrame([(i[0],i[1]) for i in literal],columns=['Dates',column]).set_index('Dates')
+    df.index = _pd.to_datetime(df.index)
+
+    return df
+
+def _legacy_convert_df_to_str(df,column):
+    sup_df = df[column].dropna()
+    ts = [(i[0].to_pydatetime().strftime('%Y/%m/%d %S:%M:%H'),i[1]) for i in sup_df.items()]
+
+    return _json.dumps(ts)
+
+# --------------------------------------------------------------------------------------------
+def run(years=20, repeat=5):
+    """ Check both codecs agree on a business-daily random walk and print timings."""
+    dates = _pd.bdate_range(end='2021-12-31', periods=252*years)
+    prices = 100*_np.exp(_np.random.default_rng(0).normal(0, 0.01, len(dates)).cumsum())
+    df = _pd.DataFrame({'ETF': prices}, index=dates)
+
+    string = _legacy_convert_df_to_str(df, 'ETF')
+    assert _convert_df_to_str(df, 'ETF') == string, 'encoded strings differ'
+    _pd.testing.assert_frame_equal(_convert_str_to_df(string, 'ETF'),
+                                   _legacy_convert_str_to_df(string, 'ETF'), check_index_type=False)
+
+    cases = {'encode': (_legacy_convert_df_to_str, _convert_df_to_str, df),
+             'decode': (_legacy_convert_str_to_df, _convert_str_to_df, string)}
+
+    print('{} observations, best of {}'.format(len(df), repeat))
+    for name, (legacy, fast, arg) in cases.items():
+        t_legacy = min(_timeit.repeat(lambda: legacy(arg, 'ETF'), number=1, repeat=repeat))
+        t_fast = min(_timeit.repeat(lambda: fast(arg, 'ETF'), number=1, repeat=repeat))
+        print('{}: legacy {:.1f} ms, vectorized {:.1f} ms ({:.0f}x)'.format(
+              name, t_legacy*1000, t_fast*1000, t_legacy/t_fast))
+
+# --------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    run()
@@ -1,7 +1,7 @@
 import dash_bootstrap_components as dbc
 from dash import html
 from ..utils import navbar, check_period
-from ..hconn import data_port, data_cmx, data_wei_hist, data_wei_last, db
+from ..hconn import data_port, data_cmx, data_wei_hist, data_wei_last, data, db
 from ..cards import cards_plots as cp
 from ..cards import cards_tables as ct
 from dash.dependencies import Input, Output
@@ -74,7 +74,7 @@ layout_home = create_layout_home()
 )
 def update_values(value):
     
-    df = check_period(data=data_port, value=value)
+    df = check_period(data=data('data_port'), value=value)
     
     out = [cp.card_performance(df)]
     return out
@@ -87,7 +87,7 @@ def update_values(value):
 )
 def update_values(value):
     
-    df = check_period(data=data_cmx, value=value)
+    df = check_period(data=data('data_cmx'), value=value)
     
     out = [cp.card_cmx(df)]
     return out
@@ -101,7 +101,7 @@ def update_values(value):
 def update_values(value):
     marks={10:'day',20:'week',30:'month',40:'quarter'}
     
-    out = [cp.card_port_returns(data_port,period=marks[value])]
+    out = [cp.card_port_returns(data('data_port'),period=marks[value])]
     return out
     
 # ---------------------------------------------------------------------------------
@@ -112,7 +112,7 @@ def update_values(value):
     [Input('slider_lookback_days_port','value')]
 )
 def update_values(value):
-    out = [cp.card_beta(data_cmx, market='PORT', window=value, legend=True)]
+    out = [cp.card_beta(data('data_cmx'), market='PORT', window=value, legend=True)]
     return out
 
 # ---------------------
@@ -122,7 +122,7 @@ def update_values(value):
     [Input('slider_lookback_days_port','value')]
 )
 def update_values(value):
-    out = [cp.card_risk(data_port, window=value)]
+    out = [cp.card_risk(data('data_port'), window=value)]
     return out
 
 # ---------------------
@@ -133,7 +133,7 @@ def update_values(value):
      Input('slider_forward_days_port','value')]
 )
 def update_values(value_window, value_forward):
-    out = [cp.card_var(data_port, window=value_window, forward=value_forward, conf=0.95)]
+    out = [cp.card_var(data('data_port'), window=value_window, forward=value_forward, conf=0.95)]
     return out
 
 # ---------------------
@@ -143,7 +143,7 @@ def update_values(value_window, value_forward):
     [Input('slider_lookback_days_port','value')]
 )
 def update_values(value):
-    out = [cp.card_exp_shortfall(data_port, window=value, conf=0.95)]
+    out = [cp.card_exp_shortfall(data('data_port'), window=value, conf=0.95)]
     return out
 
 # ---------------------
@@ -153,7 +153,7 @@ def update_values(value):
     [Input('slider_lookback_days_port','value')]
 )
 def update_values(value):
-    out = [cp.card_correl(data_cmx, window=value, base='PORT', legend=True)]
+    out = [cp.card_correl(data('data_cmx'), window=value, base='PORT', legend=True)]
     return out
 
 # ---------------------------------------------------------------------------------
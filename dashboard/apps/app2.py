@@ -3,7 +3,7 @@ import dash_bootstrap_components as dbc
 from dash import html
 import pandas as pd
 from ..utils import navbar
-from ..hconn import pdt, data_assets_cum_ret, data_assets_ann_ret, data_assets_ann_vol
+from ..hconn import pdt, data, data_assets_cum_ret, data_assets_ann_ret, data_assets_ann_vol
 from ..cards import cards_plots as cp
 from ..cards import cards_tables as ct
 from dash.dependencies import Input, Output, State
@@ -287,7 +287,7 @@ def toggle_modal(n1, n2, is_open):
 def set_date_range_for_securities(value):
     
     try:
-        ind = pdt[value].dropna(how='all').index
+        ind = data('pdt')[value].dropna(how='all').index
         start_date = ind[0]
         end_date = ind[-1]
         
@@ -304,9 +304,9 @@ def set_date_range_for_securities(value):
 def custom_dates(start, end, asset_list):
     try:
         
-        df = pd.DataFrame(pdt[asset_list].dropna(how='all')).loc[start:end,:].copy()
+        df = pd.DataFrame(data('pdt')[asset_list].dropna(how='all')).loc[start:end,:].copy()
         
         return df
     except Exception as e:
         
-        return pdt[asset_list].dropna(how='all')
\ No newline at end of file
+        return data('pdt')[asset_list].dropna(how='all')
\ No newline at end of file
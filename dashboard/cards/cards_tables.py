@@ -3,7 +3,7 @@ from .cards_templates import  card_table_triple, card_table_single
 from dash import dash_table
 from dash.dash_table.Format import Format, Scheme
 import pandas as _pd
-from ..hconn import pdt
+from ..hconn import data
 # --------------------------------------------------------------------------------------------------------------
 # Constants: table formatting
 
@@ -69,7 +69,7 @@ def table_portfolio_fund_details(assets_list, db):
 # Porfolio view: securities statistics table
 def table_portfolio_stats(assets_list, start_date=None):
 
-    df = pdt[list(assets_list)+['PORT','CASH']].copy()
+    df = data('pdt')[list(assets_list)+['PORT','CASH']].copy()
     
     if start_date is not None:
         df = df.loc[start_date:,:]
@@ -124,7 +124,7 @@ def card_table_assets_stats(assets_list, start_date=None, end_date=None):
 
     if assets_list is not None:
 
-        df = _pd.DataFrame(pdt[assets_list]).copy()
+        df = _pd.DataFrame(data('pdt')[assets_list]).copy()
         
         if start_date is not None:
             df = df.loc[start_date:,:]
@@ -1,6 +1,7 @@
 import pandas as pd
 from dotenv import load_dotenv
 import os
+import threading
 from ..analysis import HerokuDB
 from ..analysis import  Portfolio
 from ..analysis import calc_cumulative_ret, calc_annualised_ret, calc_annualised_vol
@@ -13,18 +14,53 @@ db = HerokuDB(os.environ.get("LOCAL_URI"), local_mode=True)
 db.connect()
 
 # --------------------------------------------------------------------------------------------------------------
-# All time series
-pdt = db.prices_table_read()
+# Portfolio view: price time series, weights and correlation data
+def _portfolio_view():
+    data_wei_last = Portfolio(db).fetch_weights_last()
+    assets = ['PORT'] + list(data_wei_last.index)
 
-# Portfolio view: price time series and weights
-data_port = pd.DataFrame(Portfolio(db).fetch_data()['PORT'])
-data_wei_hist = Portfolio(db).fetch_weights_history()
-data_wei_last = Portfolio(db).fetch_weights_last()
+    return {'data_port': pd.DataFrame(Portfolio(db).fetch_data()['PORT']),
+            'data_wei_hist': Portfolio(db).fetch_weights_history(),
+            'data_wei_last': data_wei_last,
+            'data_cmx': db.prices_table_read(assets_list=assets, start='2020-03-25')[assets]}
 
-# Portfolio view: Correlation data
-assets = ['PORT'] + list(data_wei_last.index)
-data_cmx = pdt[assets].loc['2020-03-25':]
-# data_cmx = db.prices_table_read(assets_list=assets).loc['2020-03-25':]
+# All time series and the portfolio view. Callbacks read them with data(name): a refresh builds
+# new frames and swaps them in at once, so readers never see a half-updated frame
+_data = dict(pdt=db.prices_table_read(), **_portfolio_view())
+_data_lock = threading.Lock()
+
+def data(name):
+    with _data_lock:
+        return _data[name]
+
+# Rebuild changed series (and the portfolio view) when prices or transactions are written by
+# another process, e.g. the daily update job. Runs on the listener thread
+def _refresh_data(namespace, symbols):
+    if namespace not in (None, 'prices', 'transactions'):
+        return
+
+    pdt = data('pdt')
+    fresh = db.prices_table_read(assets_list=None if symbols is None else list(symbols))
+
+    updated = pdt.reindex(pdt.index.union(fresh.index))
+    for column in fresh.columns:
+        updated[column] = fresh[column].reindex(updated.index)
+
+    # New dates (e.g. today) only come with the refreshed symbols: carry the others forward
+    updated = updated.ffill()
+
+    view = _portfolio_view()
+
+    with _data_lock:
+        _data['pdt'] = updated
+        _data.update(view)
+
+listener = db.listen(callback=_refresh_data)
+
+# Frames at start-up, used to build the initial layouts
+pdt = data('pdt')
+data_port, data_wei_hist = data('data_port'), data('data_wei_hist')
+data_wei_last, data_cmx = data('data_wei_last'), data('data_cmx')
 
 # Assets view: Monitor data
 data_assets_cum_ret = calc_cumulative_ret(pdt, db=db)
@@ -33,8 +69,7 @@ data_assets_ann_vol = calc_annualised_vol(pdt, db=db)
 
 # Assets view
 def _sec_list(db):
-    db.execute_sql("SELECT symbol, name FROM securities WHERE product_type='ETF' ORDER BY name ASC")
-    df = db.fetch()
+    df = db.query("SELECT symbol, name FROM securities WHERE product_type='ETF' ORDER BY name ASC")
     return df
 
 sec_list = _sec_list(db=db)
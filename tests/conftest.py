@@ -0,0 +1,52 @@
+import os
+import sys
+import pytest
+
+# Import the analysis package from this checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis as qa
+from analysis._sql_statements import sql_prices_table_create, sql_prices_daily_table_create, \
+    sql_rates_table_create
+
+
+def _sqlite_db(**kwargs):
+    db = qa.SQLiteDB(':memory:', **kwargs)
+    db.connect()
+
+    for query in [sql_prices_table_create, sql_prices_daily_table_create, sql_rates_table_create]:
+        db.execute_sql(query)
+
+    return db
+
+
+@pytest.fixture
+def sqlite_db():
+    db = _sqlite_db()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def make_sqlite_db():
+    """ Factory of in-memory SQLite databases with the prices and rates tables, closed afterwards."""
+    dbs = []
+
+    def make(**kwargs):
+        dbs.append(_sqlite_db(**kwargs))
+        return dbs[-1]
+
+    yield make
+
+    for db in dbs:
+        db.close()
+
+
+@pytest.fixture
+def pg_uri():
+    """ URI of a throwaway PostgreSQL database (QLAB_TEST_PG_URI), tests are skipped without one."""
+    uri = os.environ.get('QLAB_TEST_PG_URI')
+    if not uri:
+        pytest.skip('QLAB_TEST_PG_URI is not set')
+
+    return uri
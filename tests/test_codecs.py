@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis._utilities import _convert_df_to_str, _convert_str_to_df, _convert_df_to_bin, \
+    _convert_bin_to_df, _convert_blob_to_df, _series_hash
+
+
+@pytest.fixture
+def prices():
+    index = pd.bdate_range('2023-01-02', periods=600, name='Dates').as_unit('ns')
+    values = np.linspace(100, 160, len(index))
+    values[[5, 300]] = np.nan
+
+    return pd.DataFrame({'AAA': values}, index=index)
+
+
+def test_json_round_trip(prices):
+    df = _convert_str_to_df(_convert_df_to_str(prices, 'AAA'), 'AAA')
+
+    pd.testing.assert_series_equal(df['AAA'], prices['AAA'].dropna(), check_freq=False)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_binary_round_trip(prices, compress):
+    df = _convert_bin_to_df(_convert_df_to_bin(prices, 'AAA', compress=compress), 'AAA')
+
+    pd.testing.assert_series_equal(df['AAA'], prices['AAA'].dropna(), check_freq=False)
+
+
+def test_codecs_agree_on_date_ranges(prices):
+    start, end = '2023-06-01', '2023-09-29'
+    from_json = _convert_str_to_df(_convert_df_to_str(prices, 'AAA'), 'AAA', start=start, end=end)
+    from_bin = _convert_bin_to_df(_convert_df_to_bin(prices, 'AAA'), 'AAA', start=start, end=end)
+
+    pd.testing.assert_frame_equal(from_json, from_bin, check_freq=False)
+    assert from_bin.index[0] == pd.Timestamp(start) and from_bin.index[-1] == pd.Timestamp(end)
+
+
+def test_blob_decoding_prefers_legacy_json(prices):
+    json_df = _convert_blob_to_df(_convert_df_to_str(prices, 'AAA'), 'AAA')
+    bin_df = _convert_blob_to_df(None, 'AAA', data_bin=_convert_df_to_bin(prices, 'AAA'))
+
+    pd.testing.assert_frame_equal(json_df, bin_df, check_freq=False)
+
+
+def test_empty_series(prices):
+    empty = prices.iloc[:0]
+
+    assert _convert_str_to_df(_convert_df_to_str(empty, 'AAA'), 'AAA').empty
+    assert _convert_bin_to_df(_convert_df_to_bin(empty, 'AAA'), 'AAA').empty
+
+
+def test_unknown_binary_version_is_rejected(prices):
+    blob = bytearray(_convert_df_to_bin(prices, 'AAA'))
+    blob[4] = 99
+
+    with pytest.raises(ValueError):
+        _convert_bin_to_df(bytes(blob), 'AAA')
+
+
+def test_series_hash_ignores_missing_values(prices):
+    assert _series_hash(prices['AAA']) == _series_hash(prices['AAA'].dropna())
+    assert _series_hash(prices['AAA']) != _series_hash(prices['AAA'] + 1)
@@ -0,0 +1,23 @@
+from analysis._ft_market_data import _parse_number, _parse_aum, _summary_df
+
+
+def test_parse_number():
+    assert _parse_number('0.25') == 0.25
+    assert _parse_number(-1) == -1.0
+    assert _parse_number(-1.0) == -1.0
+    assert [_parse_number(v) for v in ['-1', '-', float('nan'), None]] == [None]*4
+
+
+def test_parse_aum():
+    assert _parse_aum('GBP 1.23bn') == (1.23, 'GBP')
+    assert _parse_aum('USD <0.05bn') == (0.05, 'USD')
+    assert _parse_aum('-') == (None, None)
+
+
+def test_summary_falls_back_to_the_net_expense_ratio():
+    labels = {'ISIN': ['IE00B4L5Y983'], 'Fund size': ['GBP 1.2bn'], 'Net expense ratio': ['0.20%'],
+              'Price currency': ['GBX'], 'Domicile': ['Ireland'], 'Launch date': ['25 Sep 2009']}
+
+    assert _summary_df(labels, 'AAA').loc['AAA', 'ExpRatio'] == 0.2
+    assert _summary_df(dict(labels, **{'Ongoing charge': ['--']}), 'AAA').loc['AAA', 'ExpRatio'] == 0.2
+    assert _summary_df(dict(labels, **{'Ongoing charge': ['0.12%']}), 'AAA').loc['AAA', 'ExpRatio'] == 0.12
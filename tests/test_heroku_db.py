@@ -0,0 +1,68 @@
+import threading
+import pandas as pd
+import analysis as qa
+from analysis._sql_statements import sql_prices_table_create
+
+
+def test_pool_waits_for_a_free_connection(pg_uri):
+    db = qa.HerokuDB(pg_uri, local_mode=True, max_conn=2)
+    db.connect()
+    results = []
+
+    def work(i):
+        df = db.query('SELECT %s AS i, pg_sleep(0.1)', (i,))
+        results.append(None if df is None else int(df['i'][0]))
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    db.close()
+
+    assert sorted(results) == list(range(8))
+
+
+def test_query_while_a_stream_holds_a_connection(pg_uri):
+    db = qa.HerokuDB(pg_uri, local_mode=True, max_conn=2)
+    db.connect()
+
+    chunks = db.fetch_chunks('SELECT generate_series(1, 10) AS n', chunksize=3)
+    assert len(next(chunks).index) == 3
+    assert db.query('SELECT 1 AS one')['one'][0] == 1
+
+    chunks.close()
+    db.close()
+
+
+def test_writes_notify_listeners(pg_uri):
+    writer = qa.HerokuDB(pg_uri, local_mode=True)
+    reader = qa.HerokuDB(pg_uri, local_mode=True, query_cache=qa.QueryCache(default_ttl=60))
+    writer.connect()
+    reader.connect()
+    writer.execute_sql('DROP TABLE IF EXISTS prices')
+    writer.execute_sql('DROP TABLE IF EXISTS series_meta')
+    writer.execute_sql(sql_prices_table_create)
+
+    received, done = [], threading.Event()
+
+    def callback(namespace, symbols):
+        received.append((namespace, symbols))
+        done.set()
+
+    listener = reader.listen(callback=callback)
+
+    writer.series('prices').write(pd.DataFrame({'AAA': [1.0, 2.0]}, index=pd.to_datetime(['2024-01-02', '2024-01-03'])))
+    reader.query('SELECT symbol FROM prices')
+    assert len(reader.query_cache._entries) == 1
+    reader._port_cache = ('fingerprint', pd.DataFrame())
+
+    done.clear()
+    writer.series('prices').write(pd.DataFrame({'BBB': [3.0]}, index=pd.to_datetime(['2024-01-03'])))
+    assert done.wait(10)
+
+    listener.stop()
+    writer.close()
+    reader.close()
+
+    assert received[-1] == ('prices', ['BBB'])
+    assert len(reader.query_cache._entries) == 0
+    assert reader._port_cache == (None, None)
@@ -0,0 +1,13 @@
+import pandas as pd
+
+
+def test_callers_are_outside_the_storage_modules(sqlite_db):
+    sqlite_db.query_stats.reset()
+    sqlite_db.series('volumes').write(pd.DataFrame({'AAA': [1.0]}, index=pd.to_datetime(['2024-01-02'])))
+
+    events = list(sqlite_db.query_stats.events)
+    assert all(e['caller'].startswith('test_instrumentation.py:') for e in events)
+    assert any(e['site'].startswith('_timeseries_store.py:') for e in events)
+
+    report = sqlite_db.query_report(by='caller')
+    assert list(report.index) == [events[0]['caller']]
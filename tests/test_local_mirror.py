@@ -0,0 +1,41 @@
+import pandas as pd
+
+
+def _frame(values, start='2024-01-01'):
+    index = pd.date_range(start, periods=len(values), name='Dates').as_unit('ns')
+    return pd.DataFrame({'AAA': values}, index=index)
+
+
+def test_reads_are_served_from_the_mirror(make_sqlite_db, tmp_path):
+    db = make_sqlite_db(mirror_dir=str(tmp_path))
+    store = db.series('prices')
+    store.write(_frame([1.0, 2.0, 3.0]))
+
+    pd.testing.assert_frame_equal(store.read(), _frame([1.0, 2.0, 3.0]), check_freq=False)
+    assert db.mirror.versions('prices') == store.versions()
+
+    # A mirrored symbol at the current version is not read from the database again
+    db.execute_sql('DELETE FROM prices')
+    assert list(store.read(start='2024-01-02')['AAA']) == [2.0, 3.0]
+
+
+def test_new_versions_are_downloaded(make_sqlite_db, tmp_path):
+    db = make_sqlite_db(mirror_dir=str(tmp_path))
+    store = db.series('prices')
+    store.write(_frame([1.0, 2.0]))
+    store.read()
+
+    store.write(_frame([5.0], start='2024-01-03'))
+
+    assert list(store.read()['AAA']) == [1.0, 2.0, 5.0]
+    assert db.mirror.versions('prices') == store.versions()
+
+
+def test_unversioned_symbols_are_read_from_the_database(make_sqlite_db, tmp_path):
+    db = make_sqlite_db(mirror_dir=str(tmp_path))
+    store = db.series('prices')
+    store.write(_frame([1.0, 2.0]))
+    db.execute_sql('DELETE FROM series_meta')
+
+    assert list(store.read()['AAA']) == [1.0, 2.0]
+    assert db.mirror.versions('prices') == {}
@@ -0,0 +1,61 @@
+import time
+import pandas as pd
+import analysis as qa
+
+
+def test_repeated_queries_are_served_from_the_cache(make_sqlite_db):
+    db = make_sqlite_db(query_cache=qa.QueryCache(default_ttl=60))
+    db.execute_sql('CREATE TABLE securities (symbol text, name text)')
+    db.execute_sql("INSERT INTO securities VALUES ('AAA', 'A fund')")
+
+    first = db.query('SELECT * FROM securities')
+    first.loc[0, 'name'] = 'changed by the caller'
+    second = db.query('SELECT * FROM securities')
+
+    assert db.query_cache.stats()['hits'] == 1
+    assert second.loc[0, 'name'] == 'A fund'
+
+
+def test_writes_invalidate_the_tables_they_touch(make_sqlite_db):
+    db = make_sqlite_db(query_cache=qa.QueryCache(default_ttl=60))
+    db.execute_sql('CREATE TABLE securities (symbol text, name text)')
+    db.execute_sql('CREATE TABLE exchanges (id integer)')
+    db.query('SELECT * FROM securities')
+    db.query('SELECT * FROM exchanges')
+
+    db.execute_sql("INSERT INTO securities VALUES ('AAA', 'A fund')")
+
+    assert len(db.query('SELECT * FROM securities').index) == 1
+    assert db.query_cache.stats()['hits'] == 0
+    db.query('SELECT * FROM exchanges')
+    assert db.query_cache.stats()['hits'] == 1
+
+
+def test_series_writes_invalidate_cached_reads(make_sqlite_db):
+    db = make_sqlite_db(query_cache=qa.QueryCache(default_ttl=60))
+    index = pd.date_range('2024-01-01', periods=2, name='Dates')
+    db.series('prices').write(pd.DataFrame({'AAA': [1.0, 2.0]}, index=index))
+    db.series('prices').read()
+
+    db.series('prices').write(pd.DataFrame({'AAA': [3.0]}, index=index[1:]))
+
+    assert list(db.series('prices').read()['AAA']) == [1.0, 3.0]
+
+
+def test_expiry_and_eviction():
+    cache = qa.QueryCache(ttls={'securities': 0.05}, max_bytes=1200)
+    df = pd.DataFrame({'a': range(50)})
+
+    cache.put('SELECT * FROM securities', None, df)
+    assert cache.get('SELECT  *  FROM securities') is not None
+    time.sleep(0.06)
+    assert cache.get('SELECT * FROM securities') is None
+
+    cache.ttls['securities'] = 60
+    cache.put('SELECT * FROM securities WHERE a = %s', (1,), df)
+    cache.put('SELECT * FROM securities WHERE a = %s', (2,), df)
+    cache.put('SELECT * FROM securities WHERE a = %s', (3,), df)
+
+    assert cache.evictions == 1
+    assert cache.get('SELECT * FROM securities WHERE a = %s', (1,)) is None
+    assert cache.get('SELECT * FROM securities WHERE a = %s', (3,)) is not None
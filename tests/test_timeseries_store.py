@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+
+def _frame(columns, start='2024-01-01', periods=5):
+    index = pd.date_range(start, periods=periods, name='Dates').as_unit('ns')
+    return pd.DataFrame({c: [float(i + 10*k) for i in range(periods)] for k, c in enumerate(columns)}, index=index)
+
+
+@pytest.mark.parametrize('codec', ['json', 'binary'])
+def test_write_and_read(make_sqlite_db, codec):
+    db = make_sqlite_db(blob_codec=codec)
+    df = _frame(['AAA', 'BBB'])
+
+    summary = db.series('prices').write(df)
+
+    assert summary['written'] == ['AAA', 'BBB'] and summary['skipped'] == []
+    pd.testing.assert_frame_equal(db.series('prices').read(), df, check_freq=False)
+    pd.testing.assert_frame_equal(db.series('prices').read(symbols=['BBB'], start='2024-01-02', end='2024-01-03'),
+                                  df.loc['2024-01-02':'2024-01-03', ['BBB']], check_freq=False)
+
+
+def test_write_merges_with_stored_observations(sqlite_db):
+    store = sqlite_db.series('prices')
+    store.write(_frame(['AAA'], periods=3))
+    store.write(_frame(['AAA'], start='2024-01-03', periods=3) + 100)
+
+    df = store.read()
+
+    assert list(df['AAA']) == [0.0, 1.0, 100.0, 101.0, 102.0]
+
+
+def test_unchanged_series_are_skipped(sqlite_db):
+    store = sqlite_db.series('prices')
+    store.write(_frame(['AAA', 'BBB']))
+    versions = store.versions()
+
+    changed = _frame(['AAA', 'BBB'])
+    changed.iloc[-1, 0] = 99.0
+    summary = store.write(changed)
+
+    assert summary['written'] == ['AAA'] and summary['skipped'] == ['BBB']
+    assert store.versions() == {'AAA': versions['AAA'] + 1, 'BBB': versions['BBB']}
+
+
+def test_namespaces_share_the_series_table(sqlite_db):
+    sqlite_db.series('volumes').write(_frame(['AAA']))
+    sqlite_db.series('returns').write(_frame(['AAA']) / 100)
+
+    assert sqlite_db.series('volumes').read()['AAA'].iloc[-1] == 4.0
+    assert sqlite_db.series('returns').read()['AAA'].iloc[-1] == 0.04
+
+
+def test_normalized_layout(make_sqlite_db):
+    db = make_sqlite_db(prices_layout='normalized')
+    store = db.series('prices')
+    store.write(_frame(['AAA']))
+
+    pd.testing.assert_frame_equal(store.read(start='2024-01-04'), _frame(['AAA']).loc['2024-01-04':],
+                                  check_freq=False, check_index_type=False)
+
+
+def test_migrate_blob_codec(sqlite_db):
+    df = _frame(['AAA'])
+    sqlite_db.series('prices').write(df)
+    sqlite_db.series('rates').write(df)
+
+    sqlite_db.migrate_blob_codec()
+
+    stored = sqlite_db.query('SELECT data, data_bin FROM prices')
+    assert sqlite_db.blob_codec == 'binary'
+    assert stored['data'].isna().all() and stored['data_bin'].notna().all()
+    pd.testing.assert_frame_equal(sqlite_db.series('prices').read(), df, check_freq=False)